@@ -2,6 +2,8 @@ import os
 
 from email.message import EmailMessage
 
+from utils import read_file_bytes
+
 class BaseEmail:
     SUBJECT = ""
     BODY_TEMPLATE = ""
@@ -15,13 +17,12 @@ class BaseEmail:
         self.msg = EmailMessage()
 
     def add_attachment(self, path, filename=None):
-        with open(path, "rb") as f:
-            self.msg.add_attachment(
-                f.read(),
-                maintype="application",
-                subtype="pdf",
-                filename=filename or os.path.basename(path),
-            )
+        self.msg.add_attachment(
+            read_file_bytes(path),
+            maintype="application",
+            subtype="pdf",
+            filename=filename or os.path.basename(path),
+        )
 
     def build(self):
         self.msg["From"] = self.sender
@@ -1,30 +1,51 @@
-import json5
 import os
+import sys
 
 MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Code shared with the other tools, like the .jsonc loader, lives in the repository's `auto_common` package
+REPO_DIR = os.path.dirname(MODULE_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+from auto_common.config import load_jsonc, lazy
+
 
 class Config:
 
     @staticmethod
-    def load_json(path):
-        with open(path) as f:
-            return json5.load(f)
-    
-    passwords = load_json(f"{MODULE_DIR}/.password.jsonc")
-    email_accounts = passwords.keys()
-   
+    def load_json(path, keep_parsed=True):
+        return load_jsonc(path, keep_parsed)
+
+    # Passwords are only loaded by the commands that use them
+    passwords = lazy(lambda: Config.load_json(f"{MODULE_DIR}/.password.jsonc", keep_parsed=False))
+    email_accounts = lazy(lambda: Config.passwords.keys())
+
     spreadsheet = f"{MODULE_DIR}/companies.csv"
-    sheet_to_df_map = load_json(f"{MODULE_DIR}/sheet_to_df_map.jsonc")
+    sheet_to_df_map = lazy(lambda: Config.load_json(f"{MODULE_DIR}/sheet_to_df_map.jsonc"))
 
     mcs150_dir = "/home/meow/work/MCS-150 forms/en/October"
     invoices_dir = "/home/meow/work/invoices/en/October"
     companies_csv_path = f"{MODULE_DIR}/data/filtered_companies.csv"
+    form_data_cache = f"{MODULE_DIR}/data/form_data_cache.sqlite3"
 
     max_emails = 20
+    smtp_server = "smtp.gmail.com"
+    smtp_port = 465
+    smtp_ssl = True
+    smtp_messages_per_connection = 100
     companies_sent_file = f"{MODULE_DIR}/data/companies_sent.txt"
+    send_ledger_path = f"{MODULE_DIR}/data/send_ledger.jsonl"
 
+    # Verification results, and the older .jsonc map they're imported from on first use
+    email_validity_db = f"{MODULE_DIR}/data/email_validity.sqlite3"
+    email_validity_ttl_days = 90
     EMAILS_BOOLMAP_PATH = f"{MODULE_DIR}/data/emails_validity.jsonc"
-    emails_boolmap = load_json(EMAILS_BOOLMAP_PATH)
+    disposable_domains_file = f"{MODULE_DIR}/disposable_domains.txt"
+    email_validation_api_url = "https://easyemailapi.com/api/verify/{email}"
+    # Match these to the verification API plan's rate limit
+    email_validation_rate = 1.0
+    email_validation_burst = 5
+    email_validation_workers = 8
 
     test_mcs150_dir = "/home/meow/work/scripts/test/mcs150"
     test_invoices_dir = "/home/meow/work/scripts/test/invoices"
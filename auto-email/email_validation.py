@@ -0,0 +1,276 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from log import log
+from config import Config
+from throttle import TokenBucket
+from validity_store import EmailValidityStore
+
+# Statuses worth retrying: the request timed out, was rate limited or the API had a hiccup
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Statuses about the API account rather than the email: a bad key, no credits left or no access
+ACCOUNT_STATUSES = {401, 402, 403}
+
+
+class TransientError(Exception):
+    """The API kept failing in a way that's likely to pass, so the email should be checked again later."""
+
+
+class AccountError(Exception):
+    """The API refused the request because of the account, so no email can be checked until it's fixed."""
+
+
+def new_session(pool_size: int):
+    """Keep-alive session with a connection pool sized for the validation workers."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def verify_email(email: str, session, api_url: str = Config.email_validation_api_url, bucket: TokenBucket | None = None,
+                 retries: int = 3, backoff: float = 2.0, deadline: float | None = None) -> dict | None:
+    """
+    Helper function to verify a single email.
+
+    Transient failures (connection errors, timeouts, 429 and 5xx responses) are retried with exponential
+    backoff, honouring Retry-After. Every request, retries included, takes a token from `bucket`. 401, 402
+    and 403 responses say nothing about the email and raise AccountError.
+
+    Args:
+        email (str): Email to verify.
+        session (requests.Session): Session the request goes through.
+        api_url (str): Verification endpoint, with an `{email}` placeholder.
+        bucket (TokenBucket, optional): Rate limit shared by all requests.
+        retries (int): Retries of transiently failed requests.
+        backoff (float): Seconds before the first retry, doubled for every next one.
+        deadline (float, optional): `time.monotonic()` time after which no request is started.
+
+    Returns:
+        dict | None: The API's parsed JSON, or None if it rejected the email for good.
+
+    Raises:
+        TransientError: If the request still failed transiently after all retries, or the deadline came first.
+        AccountError: If the API refused the request because of the account.
+    """
+    import requests
+
+    url = api_url.format(email=quote(email, safe="@"))
+    for attempt in range(retries + 1):
+        if bucket and not bucket.acquire(deadline):
+            raise TransientError("duration limit reached")
+
+        retry_after = None
+        try:
+            response = session.get(url, timeout=30)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = str(e)
+        else:
+            if response.status_code in ACCOUNT_STATUSES:
+                raise AccountError(f"HTTP {response.status_code}: {response.text[:200]}")
+            if response.status_code not in TRANSIENT_STATUSES:
+                try:
+                    response.raise_for_status()  # raises exception when not 2xx
+                    return response.json()  # return parsed JSON data
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    log.error(f"Request error for {email}: {e}")
+                    return None
+            error = f"HTTP {response.status_code}"
+            retry_after = response.headers.get("Retry-After")
+
+        if attempt < retries:
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff * 2 ** attempt * random.uniform(0.8, 1.2)
+            log.debug(f"Transient error for {email} ({error}), retrying in {delay:.1f} seconds...")
+            if deadline is not None and time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+
+    raise TransientError(error)
+
+
+def emails_to_boolmap(email_list, valid_threshold, start_time=datetime.now(), duration_limit_sec=None,
+                      api_url: str = Config.email_validation_api_url, workers: int = Config.email_validation_workers,
+                      rate: float = Config.email_validation_rate, burst: float = Config.email_validation_burst,
+                      retries: int = 3, store: EmailValidityStore | None = None) -> dict:
+    """
+    Converts an iterable of emails to a dictionary with emails as keys 
+    and boolean values indicating whether the email is valid.
+
+    Emails are verified by `workers` threads sharing a keep-alive session, at no more than `rate` requests
+    per second (with bursts of up to `burst`). Emails that only failed transiently are left out, so they're
+    checked again next time instead of being marked invalid. If the API refuses a request because of the
+    account (AccountError), validation stops: the emails not checked yet are left for the next run.
+
+    Verdicts are recorded in `store`, if given, as they arrive.
+
+    Has a built in duration limit.
+    """
+    email_status_map = {}
+    deadline = None
+    if duration_limit_sec:
+        deadline = time.monotonic() + duration_limit_sec - (datetime.now() - start_time).total_seconds()
+
+    session = new_session(workers)
+    bucket = TokenBucket(rate, burst)
+    # Set on an AccountError, so workers stop sending requests that would be refused the same way
+    aborted = threading.Event()
+
+    def check(email):
+        if aborted.is_set():
+            return email, None, TransientError("not sent, validation was stopped")
+        log.debug(f"Verifying email: '{email}'.")
+        try:
+            return email, verify_email(email, session, api_url, bucket, retries=retries, deadline=deadline), None
+        except AccountError as e:
+            aborted.set()
+            return email, None, e
+        except TransientError as e:
+            return email, None, e
+
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="validate") as executor:
+        futures = [executor.submit(check, email) for email in email_list]
+        account_error = None
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            email, data, error = future.result()
+            if isinstance(error, AccountError):
+                # Says nothing about the email, so no verdict is recorded for it
+                if account_error is None:
+                    account_error = error
+                    for pending in futures:
+                        pending.cancel()
+                    log.critical(f"The validation API refused the request for '{email}' ({error}), check the API key and plan. Stopping validation.")
+                continue
+            if error:
+                skipped += 1
+                log.debug(f"Couldn't verify '{email}' ({error}), leaving it for the next run.")
+                continue
+            if not data:
+                email_status_map[email] = False  # Mark as False (invalid) if the API rejected the email
+                if store is not None:
+                    store.record(email, False)
+                continue
+
+            score = data.get("score", 0)
+
+            # Check if the score meets the validity threshold
+            if score >= valid_threshold:
+                email_status_map[email] = True
+                log.info(f"Email '{email}' verified with score: {score}")
+            else:
+                email_status_map[email] = False
+                log.info(f"Email '{email}' has a low score of {score}, marking as invalid.")
+            if store is not None:
+                store.record(email, email_status_map[email], score)
+
+    session.close()
+    if deadline is not None and time.monotonic() >= deadline:
+        log.warning("Time limit reached. Stopping validation.")
+    if skipped:
+        log.warning(f"{skipped} emails couldn't be verified (time limit or transient API errors), they'll be checked next run.")
+    
+    # Summary logging
+    total = len(email_status_map)
+    if total > 0:
+        valid_count = sum(email_status_map.values())
+        invalid_count = total - valid_count
+        valid_pct = (valid_count / total) * 100
+        elapsed = (datetime.now() - start_time).total_seconds()
+        log.info(f"Processed {total} emails: {valid_count} valid, {invalid_count} invalid. ({valid_pct:.2f}% valid, {total / elapsed:.2f} emails/s).")
+    else:
+        log.info("No emails were processed.")
+
+    return email_status_map
+
+
+def import_legacy_map(store: EmailValidityStore, path: str) -> None:
+    """Moves the verdicts of the old .jsonc validity map into an empty store, dated to the map's last change."""
+    if len(store) or not os.path.exists(path):
+        return
+    email_validity_map = Config.load_json(path)
+    checked_at = os.path.getmtime(path)
+    store.record_many((email, valid, None, checked_at) for email, valid in email_validity_map.items())
+    log.info(f"Imported {len(email_validity_map)} verdicts from '{path}' into '{store.path}'.")
+
+
+def prescreen_emails(emails, store: EmailValidityStore, ttl: float | None, disposable_domains_file: str | None, check_dns: bool = True) -> list:
+    """
+    Screens out emails not worth a paid verification: bad syntax, placeholder, role and disposable
+    accounts, and, if `check_dns`, addresses on domains that don't exist. Screened out emails are
+    recorded as invalid in `store`.
+
+    Returns:
+        list: The emails that passed, to be verified through the API.
+    """
+    import pandas as pd
+    import prescreen
+
+    emails = pd.Series(sorted(emails), dtype="string")
+    normalized = prescreen.normalize_emails(emails)
+
+    dead_domains = set()
+    if check_dns:
+        syntax_ok = prescreen.screen_emails(normalized).ne(prescreen.SYNTAX)
+        domains = prescreen.email_domains(normalized[syntax_ok]).unique()
+        dead_domains = prescreen.find_dead_domains(domains, store, ttl)
+
+    reasons = prescreen.screen_emails(
+        normalized,
+        disposable_domains=prescreen.load_domain_list(disposable_domains_file),
+        dead_domains=dead_domains
+        )
+    screened_out = reasons.notna()
+    store.record_many((email, False, None, None) for email in emails[screened_out])
+
+    counts = ", ".join(f"{count} {reason}" for reason, count in reasons[screened_out].value_counts().items())
+    log.info(f"Pre-screening marked {screened_out.sum()} of {len(emails)} emails invalid without the API ({counts or 'none'}).")
+    return emails[~screened_out].tolist()
+
+
+def main(duration_limit_sec: int, args):
+    # Only needed once there are emails to read and validate, not for --help
+    import pandas as pd
+
+    start_time = datetime.now()
+    
+    input_csv = args.input_csv
+    ttl = args.ttl_days * 24 * 60 * 60 if args.ttl_days else None
+
+    with EmailValidityStore(args.store) as store:
+        import_legacy_map(store, Config.EMAILS_BOOLMAP_PATH)
+
+        raw_email_list = set(pd.read_csv(input_csv)['email'].dropna().tolist())
+        checked_emails = store.checked(raw_email_list, ttl)
+
+        emails = raw_email_list - checked_emails
+        log.info(f"Loaded {len(raw_email_list)} unique emails from CSV. {len(checked_emails)} already checked. Processing {len(emails)} emails.")
+        emails = prescreen_emails(emails, store, ttl, args.disposable_domains, check_dns=not args.no_dns)
+
+        result = emails_to_boolmap(
+            email_list=emails,
+            valid_threshold=args.threshold,
+            start_time=start_time,
+            duration_limit_sec=duration_limit_sec,
+            api_url=args.api_url,
+            workers=args.workers,
+            rate=args.rate,
+            burst=args.burst,
+            retries=args.retries,
+            store=store
+            )
+
+    if result:
+        log.info(f"Saved {len(result)} new email results to '{args.store}'.")
+    else:
+        log.info("No new emails were validated.")
@@ -1,83 +1,151 @@
 import argparse
-import re
+from collections import Counter
 import sys
+import time
 import pandas as pd
 
 from rich import print
 
+import prescreen
+from config import Config
+
 REQUIRED_FIELDS = ['company_name', 'contact_name', 'email', 'usdot', 'form_path', 'invoice_path']
-EMAIL_REGEX = r'^[\w\.-]+@[\w\.-]+\.\w{2,}$'
+DEFAULT_CHUNKSIZE = 100_000
+
+# Keys of the statistics gathered by `filter_data`
+ORIGINAL = "original"
+MISSING_FIELDS = "missing fields"
+KEPT = "kept"
+SCREEN_REASONS = (prescreen.SYNTAX, prescreen.PLACEHOLDER, prescreen.ROLE, prescreen.DISPOSABLE)
+
+
+def prepare(df):
+    """Drops a leftover index column from a previous export and checks the required columns are present."""
+    if 'Unnamed: 0' in df.columns:
+        df = df.drop(columns=['Unnamed: 0'])
+
+    missing_cols = [col for col in REQUIRED_FIELDS if col not in df.columns]
+    if missing_cols:
+        sys.exit(f"Missing required columns in CSV: {missing_cols}")
+    return df
 
 
 def load_csv(path):
     """Loads a CSV file into a DataFrame, skipping malformed rows."""
     try:
-        df = pd.read_csv(path, dtype=str, on_bad_lines='skip')
-
-        # Drop leftover index column from previous export, if exists
-        if 'Unnamed: 0' in df.columns:
-            df = df.drop(columns=['Unnamed: 0'])
+        return prepare(pd.read_csv(path, dtype=str, on_bad_lines='skip'))
+    except Exception as e:
+        sys.exit(f"Error loading CSV: {e}")
 
-        missing_cols = [col for col in REQUIRED_FIELDS if col not in df.columns]
-        if missing_cols:
-            sys.exit(f"Missing required columns in CSV: {missing_cols}")
 
-        return df
+def read_csv_chunks(path, chunksize):
+    """Reads a CSV file `chunksize` rows at a time, skipping malformed rows, so only one chunk is in memory."""
+    try:
+        with pd.read_csv(path, dtype=str, on_bad_lines='skip', chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield prepare(chunk)
     except Exception as e:
         sys.exit(f"Error loading CSV: {e}")
 
-def is_valid_email(email):
-    """Validates the email using regex."""
-    return re.match(EMAIL_REGEX, str(email)) is not None
-
 
 def basic_filter(df):
-    """Removes rows with missing/empty required fields, strip whitespace."""
-    df = df.dropna(subset=REQUIRED_FIELDS).loc[
-        lambda d: ~d[REQUIRED_FIELDS].apply(lambda x: x.astype(str).str.strip() == "").any(axis=1)
-    ]
-    df = df.map(lambda x: str(x).replace('\n', ' ').replace('\r', ' '))
-    return df
-
-
-def advanced_filter(df):
-    """Removes rows with invalid email formats."""
-    return df[df['email'].apply(is_valid_email)]
-
-
-def filter_data(df, verbose=False):
-    """Applies all filters in order."""
-    original_count = len(df)
-
+    """Removes rows with missing/empty required fields."""
+    empty = pd.Series(False, index=df.index)
+    for col in REQUIRED_FIELDS:
+        empty |= df[col].isna() | df[col].str.strip().eq("")
+    return df[~empty]
+
+
+def replace_line_breaks(df):
+    """Replaces line breaks in fields with spaces, so each row stays on one line of the output."""
+    # Every column is read as str
+    return df.assign(**{
+        col: df[col].str.replace("\n", " ", regex=False).str.replace("\r", " ", regex=False)
+        for col in df.columns
+    })
+
+
+def advanced_filter(df, disposable_domains=None, stats=None):
+    """
+    Normalizes emails and removes rows whose email fails the offline pre-screen:
+    bad syntax, placeholder, role or disposable accounts.
+
+    Args:
+        df (pd.DataFrame): Rows to filter.
+        disposable_domains (set[str], optional): Defaults to the list at Config.disposable_domains_file.
+        stats (Counter, optional): Counts rows removed for each pre-screen reason.
+    """
+    df = df.assign(email=prescreen.normalize_emails(df['email']))
+    if disposable_domains is None:
+        disposable_domains = prescreen.load_domain_list(Config.disposable_domains_file)
+    reasons = prescreen.screen_emails(df['email'], disposable_domains)
+
+    if stats is not None:
+        stats.update(reasons.value_counts().to_dict())
+    return df[reasons.isna()]
+
+
+def filter_data(df, stats=None, disposable_domains=None):
+    """
+    Applies all filters in order.
+
+    Args:
+        df (pd.DataFrame): Rows to filter, the whole file or one chunk of it.
+        stats (Counter, optional): Adds the rows read, removed by each filter and kept, so chunks add up.
+        disposable_domains (set[str], optional): Passed on to `advanced_filter`.
+    """
+    stats = stats if stats is not None else Counter()
+    stats[ORIGINAL] += len(df)
+
+    before_basic = len(df)
     df = basic_filter(df)
-    after_basic = len(df)
+    stats[MISSING_FIELDS] += before_basic - len(df)
 
-    df = advanced_filter(df)
-    after_advanced = len(df)
+    df = advanced_filter(df, disposable_domains, stats)
+    stats[KEPT] += len(df)
 
-    if verbose:
-        print(f"Original entries: {original_count}")
-        print(f"After basic filtering: {after_basic}")
-        print(f"After advanced filtering (email): {after_advanced}")
-        print(f"Total removed: {original_count - after_advanced}")
+    # Last, so only the rows kept are cleaned
+    return replace_line_breaks(df)
 
-    return df
+
+def print_stats(stats, elapsed):
+    """Prints the filtering statistics gathered by `filter_data`, with the throughput."""
+    after_basic = stats[ORIGINAL] - stats[MISSING_FIELDS]
+    print(f"Original entries: {stats[ORIGINAL]}")
+    print(f"After basic filtering: {after_basic} ({stats[MISSING_FIELDS]} missing required fields)")
+    for reason in SCREEN_REASONS:
+        if stats[reason]:
+            print(f"  Removed for {reason}: {stats[reason]}")
+    print(f"After advanced filtering (email): {stats[KEPT]}")
+    print(f"Total removed: {stats[ORIGINAL] - stats[KEPT]}")
+    print(f"Processed {stats[ORIGINAL]} rows in {elapsed:.2f} seconds ({stats[ORIGINAL] / max(elapsed, 1e-9):,.0f} rows/s).")
 
 def term_parse():
     parser = argparse.ArgumentParser(description="Filter CSV data based on field presence and email validity.")
     parser.add_argument("input_csv", help="Path to the input CSV file.")
     parser.add_argument("output_csv", help="Path to save the filtered CSV file.")
-    parser.add_argument("--verbose", action="store_true", help="Print filtering statistics.")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help=f"Rows read, filtered and written at a time, bounding memory use (default: {DEFAULT_CHUNKSIZE}).")
+    parser.add_argument("--verbose", action="store_true", help="Print filtering statistics and progress.")
     return parser.parse_args()
 
 def main():
     args = term_parse()
 
-    df = load_csv(args.input_csv)
-    filtered_df = filter_data(df, verbose=args.verbose)
-    filtered_df.to_csv(args.output_csv, index=False)
+    start = time.perf_counter()
+    stats = Counter()
+    disposable_domains = prescreen.load_domain_list(Config.disposable_domains_file)
+
+    # Each chunk is written as soon as it's filtered, so the output grows while the input is still being read
+    with open(args.output_csv, "w", newline="") as output:
+        for i, chunk in enumerate(read_csv_chunks(args.input_csv, args.chunksize)):
+            filtered_df = filter_data(chunk, stats, disposable_domains)
+            filtered_df.to_csv(output, index=False, header=(i == 0))
+            if args.verbose:
+                elapsed = time.perf_counter() - start
+                print(f"Processed {stats[ORIGINAL]} rows, kept {stats[KEPT]} ({stats[ORIGINAL] / max(elapsed, 1e-9):,.0f} rows/s)...")
 
     if args.verbose:
+        print_stats(stats, time.perf_counter() - start)
         print(f"Filtered data saved to: {args.output_csv}")
 
 
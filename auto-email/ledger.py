@@ -0,0 +1,149 @@
+from datetime import datetime
+import json
+import os
+import threading
+
+from log import log
+
+ATTEMPT = "attempt"
+SENT = "sent"
+FAILED = "failed"
+
+# Bytes read at a time from the end of the ledger while looking for the last complete entry
+TAIL_BLOCK_SIZE = 4096
+
+
+class SendLedger:
+    """
+    Append-only, crash-safe log of every email sent to a company, one JSON line per send attempt and result.
+
+    An attempt is on disk before its email goes out, so a crash at any point leaves the company recorded as
+    contacted: a company counts as contacted unless its last attempt is known to have failed.
+
+    Every attempt costs one fsync, on purpose. Inboxes pace their emails tens of seconds apart, so the few
+    milliseconds of an fsync are noise next to the wait, while batching attempts into fewer fsyncs would leave
+    the latest ones only in the page cache: a crash would lose them, and the rerun would email those companies
+    a second time. Results don't need to be durable right away and ride along with the next attempt's fsync.
+    The fsync is group-committed, so attempts from inboxes that happen to send at the same moment share one,
+    though with paced inboxes that is the exception.
+
+    Args:
+        path (str): Path to the ledger file, created if it doesn't exist.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.repair_tail(path)
+        self.statuses = self.load(path)
+
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._written = 0
+        self._synced = 0
+        self.syncs = 0
+        log.debug(f"Using send ledger at '{path}' ({len(self.contacted)} companies contacted).")
+
+    @staticmethod
+    def load(path: str) -> dict[str, str]:
+        """Reads a ledger into USDOT -> status of its last entry."""
+        statuses = {}
+        if not os.path.exists(path):
+            return statuses
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line may be cut short by a crash mid-write
+                    log.warning(f"Skipping malformed send ledger entry: {line.strip()!r}")
+                    continue
+                statuses[entry["usdot"]] = entry["status"]
+        return statuses
+
+    @staticmethod
+    def repair_tail(path: str) -> None:
+        """
+        Makes the ledger end with a complete line, so the next entry appended starts on a line of its own
+        instead of being glued onto a torn one and lost with it. An entry cut short by a crash mid-write is
+        truncated; one that was only missing its newline gets it back.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(position - TAIL_BLOCK_SIZE, 0)
+                f.seek(start)
+                block = f.read(position - start)
+                newline = block.rfind(b"\n")
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position == end:
+                return
+            f.seek(position)
+            tail = f.read()
+            try:
+                json.loads(tail)
+                f.write(b"\n")
+            except ValueError:
+                log.warning(f"Dropping torn send ledger entry: {tail[:200].decode(errors='replace')!r}")
+                f.truncate(position)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def read_contacted(cls, path: str) -> set[str]:
+        """USDOTs of the companies contacted according to the ledger at `path`, without opening it for writing."""
+        return {usdot for usdot, status in cls.load(path).items() if status != FAILED}
+
+    @property
+    def contacted(self) -> set[str]:
+        with self._lock:
+            return {usdot for usdot, status in self.statuses.items() if status != FAILED}
+
+    def __contains__(self, usdot) -> bool:
+        with self._lock:
+            status = self.statuses.get(str(usdot))
+        return status is not None and status != FAILED
+
+    def record(self, usdot, status: str, durable: bool = False, **details) -> None:
+        """
+        Appends an entry for the USDOT.
+
+        Args:
+            usdot: Company USDOT.
+            status (str): ATTEMPT, SENT or FAILED.
+            durable (bool): Wait until the entry is fsynced. Needed for attempts, before the email goes out.
+            **details: Extra fields to record, e.g. the recipient's email, the inbox or an error.
+        """
+        entry = {"time": datetime.now().isoformat(timespec="seconds"), "usdot": str(usdot), "status": status, **details}
+        with self._lock:
+            self._file.write(json.dumps(entry, default=str) + "\n")
+            self._written += 1
+            position = self._written
+            self.statuses[entry["usdot"]] = status
+        if durable:
+            self.sync(position)
+
+    def sync(self, position: int | None = None) -> None:
+        """Makes every entry up to `position` (default: all written so far) durable, with one fsync for all of them."""
+        with self._sync_lock:
+            if position is not None and self._synced >= position:
+                return
+            with self._lock:
+                self._file.flush()
+                written = self._written
+            if self._synced >= written:
+                return
+            os.fsync(self._file.fileno())
+            self._synced = written
+            self.syncs += 1
+
+    def close(self) -> None:
+        self.sync()
+        self._file.close()
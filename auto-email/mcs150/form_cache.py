@@ -0,0 +1,73 @@
+import os
+import sqlite3
+
+from log import log
+
+
+class FormDataCache:
+    """
+    On-disk store of the data extracted from MCS-150 forms, keyed by form path and backed by SQLite.
+
+    Each entry keeps the form's size and version (see `utils.file_signature`) at the time it was read, so
+    an entry only counts as a hit while the form on disk is unchanged.
+    """
+    FIELDS = ("email", "contact_name", "usdot")
+
+    def __init__(self, path: str):
+        self.path = path
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS forms (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                email TEXT,
+                contact_name TEXT,
+                usdot TEXT
+            )
+        """)
+        self._conn.commit()
+        self._entries = None
+        log.debug(f"Using MCS-150 form data cache at: '{path}'.")
+
+    def get(self, form_path: str, signature: tuple[int, int]) -> dict | None:
+        """Returns the data extracted from the form, or None if it wasn't extracted or has changed since."""
+        if self._entries is None:
+            # One query for the whole table beats one per form when loading thousands of them
+            self._entries = {
+                row[0]: row[1:] for row in self._conn.execute(
+                    f"SELECT path, size, version, {', '.join(self.FIELDS)} FROM forms"
+                )
+            }
+
+        entry = self._entries.get(str(form_path))
+        if entry is None or tuple(entry[:2]) != tuple(signature):
+            return None
+        return dict(zip(self.FIELDS, entry[2:]))
+
+    def set_many(self, entries) -> None:
+        """
+        Stores extracted form data.
+
+        Args:
+            entries (Iterable[tuple[str, tuple[int, int], dict]]): `(form path, signature, data)` triples.
+        """
+        rows = [
+            (str(form_path), *signature, *(data.get(field) for field in self.FIELDS))
+            for form_path, signature, data in entries
+        ]
+        if not rows:
+            return
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO forms (path, size, version, {', '.join(self.FIELDS)}) "
+            + f"VALUES ({', '.join('?' * (3 + len(self.FIELDS)))})", rows
+        )
+        self._conn.commit()
+        if self._entries is not None:
+            self._entries.update((row[0], row[1:]) for row in rows)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,15 +1,28 @@
 from PyPDFForm import PdfWrapper
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+import csv
+import multiprocessing
 import os
+import zipfile
 
-from utils import normalize_name, load_paths_from_dir
+from mcs150.form_cache import FormDataCache
+from utils import normalize_name, load_paths_from_dir, read_file_bytes, file_signature, open_archive
+from config import Config
 from log import log
 
+# Below this many forms to extract, starting worker processes costs more than it saves
+MIN_FORMS_FOR_POOL = 32
+# Extracted data is saved to the cache every this many forms, so an interrupted run keeps its progress
+CACHE_BATCH_SIZE = 500
+
 def extract_company_from_mcs(form_path) -> dict:
     try:
+        log.debug(f"Extracting data from MCS-150 form at '{form_path}'.")
         company = {"email":None, "contact_name":None, "usdot":None}
-        form_fields = PdfWrapper(str(form_path)).data
+        form_fields = PdfWrapper(read_file_bytes(form_path)).data
         
         company["email"] = form_fields.get("20eMail","")
         company["contact_name"] = form_fields.get("certifyName")
@@ -22,9 +35,125 @@ def extract_company_from_mcs(form_path) -> dict:
     return company
 
 
-def load_companies_from_forms(forms_dir, invoices_dir) -> pd.DataFrame:
+def extract_companies(forms, cache: FormDataCache | None = None, workers: int | None = None) -> dict[str, dict]:
+    """
+    Extracts company data from MCS-150 forms, reusing cached data for forms that haven't changed since they
+    were last read. The remaining forms are read in parallel by `workers` processes.
+
+    Args:
+        forms (list[str]): Paths to the forms.
+        cache (FormDataCache, optional): Cache of previously extracted form data, updated with new extractions.
+        workers (int, optional): Number of processes extracting forms, defaults to the number of CPUs.
+
+    Returns:
+        dict[str, dict]: Form path -> extracted company data, empty for forms that couldn't be read.
+    """
+    companies = {}
+    misses = []
+    for form in forms:
+        try:
+            signature = file_signature(form)
+        except Exception as e:
+            log.debug(f"Couldn't stat form at '{form}': {e}")
+            signature = None
+
+        cached = cache.get(form, signature) if cache and signature else None
+        if cached is not None:
+            companies[form] = cached
+        else:
+            misses.append((form, signature))
+
+    workers = workers or os.cpu_count() or 1
+    if cache:
+        log.info(f"Reusing data of {len(companies)} unchanged forms, extracting {len(misses)} forms.")
+
+    def collect(results):
+        batch = []
+        for (form, signature), company in zip(misses, results):
+            companies[form] = company
+            if signature and company:
+                batch.append((form, signature, company))
+            if cache and len(batch) >= CACHE_BATCH_SIZE:
+                cache.set_many(batch)
+                batch.clear()
+        if cache:
+            cache.set_many(batch)
+
+    paths = [form for form, _ in misses]
+    if workers > 1 and len(paths) >= MIN_FORMS_FOR_POOL:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            collect(executor.map(extract_company_from_mcs, paths, chunksize=max(1, len(paths) // (workers * 8))))
+    else:
+        collect(map(extract_company_from_mcs, paths))
+
+    return companies
+
+
+def index_forms_by_usdot(forms_dir, cache_path: str | None = Config.form_data_cache, workers: int | None = None) -> dict[str, list[str]]:
+    """
+    Maps each USDOT to the MCS-150 forms filled for it in `forms_dir`.
+
+    ZIP archives written by `auto_mcs150 --archive` come with an index of their forms by USDOT
+    (`{archive}.index.csv`), which is used as is. Otherwise the USDOT is read from every form, through the
+    form data cache.
+
+    Args:
+        forms_dir (str): Directory (or ZIP archive) of MCS-150 forms.
+        cache_path (str, optional): Path to the form data cache, None to read every form.
+        workers (int, optional): Number of processes extracting forms, defaults to the number of CPUs.
+
+    Returns:
+        dict[str, list[str]]: USDOT -> paths of its forms.
+    """
+    index = defaultdict(list)
+
+    archive_index_path = f"{forms_dir}.index.csv"
+    if zipfile.is_zipfile(forms_dir) and os.path.isfile(archive_index_path):
+        members = set(open_archive(forms_dir).namelist())
+        with open(archive_index_path, newline="") as f:
+            for row in csv.DictReader(f):
+                form = os.path.join(forms_dir, row["member"])
+                # Indexes written by older versions may list a form twice, or list forms a crash kept out of the archive
+                if row["member"] in members and form not in index[row["usdot"]]:
+                    index[row["usdot"]].append(form)
+        log.info(f"Indexed {sum(map(len, index.values()))} forms by USDOT from '{archive_index_path}'.")
+        return dict(index)
+
+    forms = load_paths_from_dir(forms_dir, '.pdf')
+    cache = FormDataCache(cache_path) if cache_path else None
+    try:
+        extracted = extract_companies(forms, cache, workers)
+    finally:
+        if cache:
+            cache.close()
+
+    for form in forms:
+        usdot = str(extracted[form].get("usdot") or "").strip()
+        if usdot:
+            index[usdot].append(form)
+    log.info(f"Indexed {len(forms)} forms by USDOT ({len(index)} USDOTs).")
+    return dict(index)
+
+
+def load_companies_from_forms(forms_dir, invoices_dir, cache_path: str | None = Config.form_data_cache, workers: int | None = None) -> pd.DataFrame:
+    """
+    Loads company data from the MCS-150 forms in `forms_dir` and pairs each company with its invoice.
+
+    Args:
+        forms_dir (str): Directory (or ZIP archive) of MCS-150 forms.
+        invoices_dir (str): Directory of invoices.
+        cache_path (str, optional): Path to the form data cache, None to read every form.
+        workers (int, optional): Number of processes extracting forms, defaults to the number of CPUs.
+    """
     forms = load_paths_from_dir(forms_dir, '.pdf')
     invoices = load_paths_from_dir(invoices_dir, '.pdf')
+
+    cache = FormDataCache(cache_path) if cache_path else None
+    try:
+        extracted = extract_companies(forms, cache, workers)
+    finally:
+        if cache:
+            cache.close()
     
     # Build invoice lookup by normalized company name
     invoice_lookup = {normalize_name(inv): inv for inv in invoices}
@@ -34,8 +163,7 @@ def load_companies_from_forms(forms_dir, invoices_dir) -> pd.DataFrame:
         try:
             company_key = normalize_name(form)
             invoice_path = invoice_lookup.get(company_key)
-            log.debug(f"Extracting data from MCS-150 form at '{form}': ")
-            company = extract_company_from_mcs(form)
+            company = extracted[form]
 
             company_name = company_key.upper().replace('_',' ')
             contact_name = company.get(f"contact_name", "")
@@ -1,16 +1,21 @@
 import pandas as pd
 
 import random
-import time
+import smtplib
+import threading
 
 from mcs150.send import send_mcs150_and_invoice
 from mcs150.load import load_companies_from_forms
-from utils import is_inside_dir, load_str_list, save_str_list
+from mcs150.scheduler import ClaimTable, send_from_inboxes
+from utils import is_inside_dir, load_str_list
+from smtp_session import SMTPSession
+from ledger import SendLedger, ATTEMPT, SENT, FAILED
 from log import log
 from config import Config
 
 
-def process_companies(companies: pd.DataFrame, max_emails, email_login, email_password, ignore_list=None, emails_boolmap=None, delay: float = 5, jitter=0.5) -> set:
+def process_companies(companies: pd.DataFrame, max_emails, email_login, email_password, ignore_list=None, emails_boolmap=None, delay: float = 5, jitter=0.5,
+                      claims: ClaimTable | None = None, stop: threading.Event | None = None, ledger: SendLedger | None = None) -> set:
     """
     Iterates through a DataFrame of companies and sends each their messages,
     form and invoice via email.
@@ -22,18 +27,31 @@ def process_companies(companies: pd.DataFrame, max_emails, email_login, email_pa
         jitter (float): Proportion of delay to randomize (e.g., 0.3 = ±30%).
         ignore_list (list[str]): List of company usdots to ignore
         emails_boolmap (list[str]): A map of emails and their states, True for valid and False for invalid
+        claims (ClaimTable): Claim table shared with inboxes sending at the same time, so each company is emailed from one inbox only
+        stop (threading.Event): Stops sending once set, instead of waiting out the delay before the next email
+        ledger (SendLedger): Ledger every send attempt and its result are recorded in
 
     Returns:
         companies_sent (set): set of company usdots that have already received a message 
     """
-    ignore_list = ignore_list or []
+    ignore_list = set(ignore_list or [])
     emails_boolmap = emails_boolmap or {}
+    stop = stop or threading.Event()
     
     required_fields = ["email", "form_path", "invoice_path", "company_name", "contact_name", "usdot"]
     
     companies_sent = set()
 
+    # One authenticated connection for the whole inbox, instead of a new one per email
+    session = SMTPSession(email_login, email_password,
+                          host=Config.smtp_server,
+                          port=Config.smtp_port,
+                          use_ssl=Config.smtp_ssl,
+                          max_messages=Config.smtp_messages_per_connection)
+
     for row in companies.itertuples(index=False):
+        if stop.is_set():
+            break
         
         missing = [field for field in required_fields if not getattr(row, field, None)]
         email = getattr(row, "email", None)
@@ -49,7 +67,15 @@ def process_companies(companies: pd.DataFrame, max_emails, email_login, email_pa
         if not emails_boolmap.get(row.email, True):
             log.debug(f"Email {row.email} is marked as invalid - skipping.")
             continue
+
+        if claims and not claims.claim(row.usdot, email_login):
+            log.debug(f"Company {row.company_name} (USDOT {row.usdot}) is emailed from another inbox - skipping.")
+            continue
         
+        if ledger:
+            # On disk before the email goes out, so a crash can't lead to emailing the company again.
+            # One fsync per email is cheap next to the delay between emails, see SendLedger
+            ledger.record(row.usdot, ATTEMPT, durable=True, email=row.email, inbox=email_login)
         try:
             send_mcs150_and_invoice(
                 email_from=email_login,
@@ -60,12 +86,26 @@ def process_companies(companies: pd.DataFrame, max_emails, email_login, email_pa
                 contact_name=row.contact_name,
                 company_name=row.company_name,
                 usdot=row.usdot,
-                dryfire=False
+                dryfire=False,
+                session=session
             )
             pass
             companies_sent.add(row.usdot)
+            if ledger:
+                ledger.record(row.usdot, SENT, email=row.email, inbox=email_login)
+        except smtplib.SMTPAuthenticationError as e:
+            log.critical(f"Couldn't log in to inbox '{email_login}', stopping sending from it: {e}")
+            if ledger:
+                ledger.record(row.usdot, FAILED, email=row.email, inbox=email_login, error=str(e))
+            if claims:
+                claims.release(row.usdot)
+            break
         except Exception as e:
             log.error(f"Error sending email to '{row.email}': {e}")
+            if ledger:
+                ledger.record(row.usdot, FAILED, email=row.email, inbox=email_login, error=str(e))
+            if claims:
+                claims.release(row.usdot)
         
         if len(companies_sent) >= max_emails:
             log.debug(f"Max emails limit of {max_emails} hit at {row.email}, stopping the sending process.")
@@ -74,7 +114,11 @@ def process_companies(companies: pd.DataFrame, max_emails, email_login, email_pa
         # Apply jitter: random delay in [delay * (1 - jitter), delay * (1 + jitter)]
         sleep_time = random.uniform(delay * (1 - jitter), delay * (1 + jitter))
         log.debug(f"Sleeping for {sleep_time:.2f} seconds before next email...")
-        time.sleep(sleep_time)
+        if stop.wait(sleep_time):
+            break
+
+    session.close()
+    log.debug(f"Sent {session.messages_sent} emails from '{email_login}' over {session.connections} SMTP connections.")
 
     return companies_sent
 
@@ -87,6 +131,7 @@ def send_emails(
         invoices_dir=None,
         emails_boolmap=None,
         companies_sent_file="",
+        send_ledger_path=Config.send_ledger_path,
         ):
     """
     Coordinates the process of sending emails with MCS-150 forms and invoices to companies.
@@ -101,7 +146,9 @@ def send_emails(
         forms_dir (str, optional): Directory path containing MCS-150 forms to load companies from.
         invoices_dir (str, optional): Directory path containing invoice files to load companies from.
         emails_boolmap (dict[str, bool], optional): Mapping of email addresses to their validity status.
-        companies_sent_file (str, optional): Path to file storing list of companies that have already been emailed.
+        companies_sent_file (str, optional): Path to a file listing USDOTs of companies to skip, one per line. Only read,
+            never written: it is the skip list from before the send ledger, and new sends go to the ledger only.
+        send_ledger_path (str, optional): Path to the ledger recording every email sent; companies in it are skipped.
 
     Returns:
         None
@@ -109,7 +156,7 @@ def send_emails(
     Side effects:
         Loads and filters companies based on provided parameters.
         Sends emails to companies using provided email accounts.
-        Updates and saves the list of companies already sent emails.
+        Records every send attempt and its result in the send ledger as it happens.
         Logs key events and errors during the process.
     """
     email_accounts = email_accounts or []
@@ -121,14 +168,13 @@ def send_emails(
         password = Config.passwords.get(login)
         if not password:
             log.error(f"Email '{login}' app password not present in '.password.jsonc' - skipping.")
+            continue
         inboxes.update({login: password})
         log.debug(f"Inbox dictionary updated successfully with {login}.")
     if not inboxes:
         log.critical(f"No usable email credentials found for email accounts.")
         return
     
-    companies_sent = set(load_str_list(companies_sent_file, "companies_sent_file"))
-
     # Loading companies from MCS-150 forms or from a .csv
     if companies_data_file:
         log.info(f"Loading companies from csv.")
@@ -156,26 +202,26 @@ def send_emails(
         log.critical(f"Cannot proceed with sending, missing arguments: {', '.join(missing)}")
         return
 
-    # Sending emails with inbox rotation
-    log.info(f"Sending emails...")
-    email_count = 0
-    for login, password in inboxes.items():
+    # Sending emails from all inboxes at once, each paced on its own
+    log.info(f"Sending emails from {len(inboxes)} inboxes...")
+    ledger = SendLedger(send_ledger_path)
+    companies_sent = ledger.contacted | set(load_str_list(companies_sent_file, "companies_sent_file"))
+    claims = ClaimTable(done=companies_sent)
+
+    def send_from_inbox(login, password, claims, stop):
         log.info(f"Sending emails from inbox: '{login}'.")
-        current_companies_sent = process_companies(companies, max_emails, login, password,
-            ignore_list=companies_sent,
+        return process_companies(companies, max_emails, login, password,
             emails_boolmap=emails_boolmap,
-            delay=40
+            delay=40,
+            claims=claims,
+            stop=stop,
+            ledger=ledger
             )
-        companies_sent = list(set(companies_sent).union(current_companies_sent))
-        email_count += len(current_companies_sent)
-
-    log.info(f"Total emails sent: {email_count}")
-
-    # Updating the ignore list with processed emails
-    save_str_list(
-        str_list=companies_sent,
-        filepath=companies_sent_file,
-        label="companies_sent_file",
-        mode="w"
-    )
+
+    try:
+        current_companies_sent = send_from_inboxes(send_from_inbox, inboxes, claims)
+    finally:
+        ledger.close()
+
+    log.info(f"Total emails sent: {len(current_companies_sent)} (send ledger at '{send_ledger_path}', {ledger.syncs} fsyncs).")
 
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from log import log
+
+
+class ClaimTable:
+    """
+    Thread-safe record of which inbox is emailing which company, shared by inboxes sending concurrently,
+    so no USDOT gets an email from two inboxes.
+
+    Args:
+        done (Iterable[str], optional): USDOTs already emailed, which can't be claimed at all.
+    """
+
+    def __init__(self, done=None):
+        self._lock = threading.Lock()
+        self._owners: dict[str, str | None] = dict.fromkeys(map(str, done or ()))
+
+    def claim(self, usdot, inbox: str) -> bool:
+        """Claims the USDOT for the inbox. Returns False if it's already emailed or claimed by another inbox."""
+        usdot = str(usdot)
+        with self._lock:
+            if usdot in self._owners:
+                return False
+            self._owners[usdot] = inbox
+            return True
+
+    def release(self, usdot) -> None:
+        """Gives up a claim after a failed send, so another inbox may try the USDOT."""
+        with self._lock:
+            self._owners.pop(str(usdot), None)
+
+    def __contains__(self, usdot) -> bool:
+        with self._lock:
+            return str(usdot) in self._owners
+
+
+def send_from_inboxes(send, inboxes: dict, claims: ClaimTable) -> set:
+    """
+    Runs `send` for every inbox at once, each in its own thread with its own pacing and quota. Total time is
+    that of the slowest inbox rather than the sum of all of them.
+
+    Args:
+        send (Callable): `send(login, password, claims, stop) -> set` sending from one inbox and returning
+                         the USDOTs it emailed. Should return early once `stop` is set.
+        inboxes (dict[str, str]): Inbox login -> password.
+        claims (ClaimTable): Claim table shared by the inboxes.
+
+    Returns:
+        set: USDOTs emailed from any inbox.
+    """
+    stop = threading.Event()
+    companies_sent = set()
+
+    with ThreadPoolExecutor(max_workers=len(inboxes), thread_name_prefix="inbox") as executor:
+        futures = {executor.submit(send, login, password, claims, stop): login for login, password in inboxes.items()}
+        try:
+            for future, login in futures.items():
+                try:
+                    sent = future.result()
+                except Exception as e:
+                    log.error(f"Sending from inbox '{login}' failed: {e}")
+                    continue
+                log.info(f"Inbox '{login}' sent {len(sent)} emails.")
+                companies_sent.update(sent)
+        except KeyboardInterrupt:
+            # Let the inboxes finish the emails they're sending, so the ones sent are still recorded
+            log.warning("Interrupted, stopping the inboxes after their current emails...")
+            stop.set()
+            for future in futures:
+                if not future.exception():
+                    companies_sent.update(future.result())
+
+    return companies_sent
@@ -3,8 +3,13 @@ from log import log
 from utils import send_email
 
 
-def send_mcs150_and_invoice(email_from, password, email_to, mcs150_path, invoice_path, dryfire = False, **kwargs) -> None:
-    """Sends an email with an MCS-150 form and invoice attached to the specified recipient."""
+def send_mcs150_and_invoice(email_from, password, email_to, mcs150_path, invoice_path, dryfire = False, session = None, **kwargs) -> None:
+    """
+    Sends an email with an MCS-150 form and invoice attached to the specified recipient.
+
+    Sent through `session` (an open SMTPSession of the sender's inbox) if given, which raises on failure;
+    otherwise through a connection of its own, logging failures.
+    """
     log.debug(f"Crafting message for '{email_to}'")
     msg = Message(
         sender = email_from,
@@ -18,5 +23,8 @@ def send_mcs150_and_invoice(email_from, password, email_to, mcs150_path, invoice
     if dryfire:
         log.debug(f"Email fired!")
         return 
+    if session:
+        session.send_message(msg)
+        return
     send_email(msg, email_from, password)
 
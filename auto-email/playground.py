@@ -3,6 +3,7 @@ import pandas as pd
 from config import Config, MODULE_DIR
 import pandas as pd
 
+from ledger import SendLedger
 from utils import load_str_list
 
 # --- File paths ---
@@ -13,8 +14,8 @@ output_csv_path = f'{MODULE_DIR}/filtered_new_targets.csv'
 # --- Load CSV with all data (dtype=str) ---
 df = pd.read_csv(input_csv_path, dtype=str, keep_default_na=False)
 
-# --- Load list of already-messaged USDOTs ---
-already_sent_usdots = set(load_str_list(already_contacted_txt))
+# --- Load USDOTs already messaged, from the send ledger and the older skip list ---
+already_sent_usdots = SendLedger.read_contacted(Config.send_ledger_path) | set(load_str_list(already_contacted_txt))
 
 # --- Filter: keep only rows where 'usdot' not in the already-sent set ---
 df_filtered = df[~df['usdot'].isin(already_sent_usdots)]
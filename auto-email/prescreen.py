@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import socket
+
+import numpy as np
+import pandas as pd
+
+from log import log
+
+# RFC 5322 dot-atom addresses (no quoted local parts or IP literals) on a domain with a real-looking TLD,
+# at most 254 characters with a local part of at most 64. Also captures the account (the local part up to
+# a +tag) and the domain, so screening needs a single pass over the emails. Compiled once, not per chunk.
+EMAIL_PATTERN = re.compile(
+    r"\A(?=.{1,254}\Z)(?=[^@]{1,64}@)(?=(?P<account>[^+@]*))"
+    r"[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@(?P<domain>(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63})\Z"
+)
+
+# Accounts that never reach a person; general inboxes like info@ or office@ often are the company's only one
+ROLE_ACCOUNTS = {
+    "noreply", "no-reply", "no_reply", "donotreply", "do-not-reply", "do_not_reply", "postmaster", "hostmaster",
+    "webmaster", "abuse", "mailer-daemon", "bounce", "bounces", "unsubscribe", "nobody",
+}
+# What gets typed into a form's email field when there's no email to give
+PLACEHOLDER_ACCOUNTS = {
+    "none", "na", "noemail", "no-email", "no_email", "nomail", "null", "unknown", "test", "example", "fake",
+    "asdf", "xxx", "xxxx", "email", "youremail", "your.email", "name", "abc",
+}
+PLACEHOLDER_DOMAINS = {
+    "example.com", "example.org", "example.net", "test.com", "none.com", "noemail.com", "nomail.com",
+    "domain.com", "email.test", "invalid.com", "na.com", "unknown.com",
+}
+# Used when no disposable domains list is around; a maintained list can be dropped in at
+# Config.disposable_domains_file instead
+DISPOSABLE_DOMAINS = {
+    "mailinator.com", "guerrillamail.com", "10minutemail.com", "yopmail.com", "temp-mail.org",
+    "trashmail.com", "sharklasers.com", "getnada.com", "dispostable.com", "maildrop.cc",
+}
+
+# Screening outcomes, in the order they're checked; an email gets the first that applies
+SYNTAX = "syntax"
+PLACEHOLDER = "placeholder"
+ROLE = "role"
+DISPOSABLE = "disposable"
+DEAD_DOMAIN = "dead_domain"
+
+# Resolved first to tell a dead domain from a resolver that can't reach DNS at all
+CANARY_DOMAIN = "gmail.com"
+
+
+def load_domain_list(path: str | None) -> set[str]:
+    """
+    Reads a domain list, one domain per line, ignoring blank lines and `#` comments.
+    Falls back to the built-in DISPOSABLE_DOMAINS if there's no file at `path`.
+    """
+    if not path or not os.path.exists(path):
+        return set(DISPOSABLE_DOMAINS)
+    with open(path) as f:
+        domains = {line.split("#", 1)[0].strip().lower() for line in f}
+    domains.discard("")
+    log.debug(f"Loaded {len(domains)} domains from '{path}'.")
+    return domains
+
+
+def normalize_emails(emails: pd.Series) -> pd.Series:
+    """Strips whitespace, `mailto:`, angle brackets and trailing dots from emails and lowercases them."""
+    return (
+        emails.astype("string")
+        .str.strip()
+        .str.lower()
+        .str.removeprefix("mailto:")
+        # Trailing dots and the closing bracket together, so "<name@domain.com>." loses both
+        .str.rstrip("> .")
+        .str.lstrip("< ")
+    )
+
+
+def email_domains(emails: pd.Series) -> pd.Series:
+    """Domain part of normalized emails."""
+    return emails.str.rpartition("@")[2]
+
+
+def screen_emails(emails: pd.Series, disposable_domains=DISPOSABLE_DOMAINS, dead_domains=()) -> pd.Series:
+    """
+    Screens normalized emails without calling any API.
+
+    Args:
+        emails (pd.Series): Emails, as returned by `normalize_emails`.
+        disposable_domains (Iterable[str]): Domains of throwaway inboxes.
+        dead_domains (Iterable[str]): Domains known not to exist, e.g. from `find_dead_domains`.
+
+    Returns:
+        pd.Series: Per email, why it was screened out (SYNTAX, PLACEHOLDER, ROLE, DISPOSABLE or DEAD_DOMAIN),
+                   or None if it passed and is worth verifying.
+    """
+    emails = emails.astype("string").fillna("")
+    parts = emails.str.extract(EMAIL_PATTERN)
+    # Tags like name+crm@ are the same account
+    account, domain = parts["account"], parts["domain"]
+
+    reasons = np.select(
+        [
+            domain.isna(),
+            account.isin(PLACEHOLDER_ACCOUNTS) | domain.isin(PLACEHOLDER_DOMAINS),
+            account.isin(ROLE_ACCOUNTS),
+            domain.isin(set(disposable_domains)),
+            domain.isin(set(dead_domains)),
+        ],
+        [SYNTAX, PLACEHOLDER, ROLE, DISPOSABLE, DEAD_DOMAIN],
+        default=None,
+    )
+    return pd.Series(reasons, index=emails.index, dtype=object)
+
+
+def resolve_domain(domain: str) -> bool | None:
+    """Returns True if the domain resolves, False if it doesn't exist, or None if DNS couldn't tell."""
+    try:
+        socket.getaddrinfo(domain, None)
+    except socket.gaierror as e:
+        return False if e.errno == socket.EAI_NONAME else None
+    except (UnicodeError, OSError):
+        return None
+    return True
+
+
+def find_dead_domains(domains, store=None, ttl: float | None = None, workers: int = 16) -> set[str]:
+    """
+    Finds the domains that don't exist, so every address on them is invalid without verifying any.
+
+    Verdicts are cached per domain in `store`, so each domain is resolved once for all of its addresses and,
+    until the verdict is older than `ttl` seconds, for later runs too. Only a name DNS reports as unknown
+    counts as dead; lookups that fail for any other reason decide nothing and aren't cached.
+
+    Args:
+        domains (Iterable[str]): Domains to check.
+        store (EmailValidityStore, optional): Store caching domain verdicts.
+        ttl (float, optional): Seconds a cached verdict stays valid, None to keep them forever.
+        workers (int): Concurrent DNS lookups.
+
+    Returns:
+        set[str]: The dead domains.
+    """
+    domains = set(domains)
+    cached = store.domain_verdicts(domains, ttl) if store is not None else {}
+    dead = {domain for domain, is_dead in cached.items() if is_dead}
+    to_resolve = sorted(domains - cached.keys())
+    if not to_resolve:
+        return dead
+
+    if not resolve_domain(CANARY_DOMAIN):
+        log.warning(f"Couldn't resolve '{CANARY_DOMAIN}', skipping the DNS check of {len(to_resolve)} domains.")
+        return dead
+
+    log.info(f"Resolving {len(to_resolve)} domains ({len(cached)} cached)...")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dns") as executor:
+        resolved = dict(zip(to_resolve, executor.map(resolve_domain, to_resolve)))
+
+    verdicts = {domain: not resolves for domain, resolves in resolved.items() if resolves is not None}
+    if store is not None:
+        store.record_domains(verdicts.items())
+    dead.update(domain for domain, is_dead in verdicts.items() if is_dead)
+    return dead
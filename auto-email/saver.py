@@ -1,20 +1,26 @@
 import argparse
 
-from mcs150.load import load_companies_from_forms
-from log import log 
-
 def term_parse():
     parser = argparse.ArgumentParser()
     parser.add_argument("--csv_path", help="Path to the output CSV.")
-    parser.add_argument("--mcs150_dir", help="Directory of MCS-150 forms that will be used for extracting emails.")
+    parser.add_argument("--mcs150_dir", help="Directory (or ZIP archive) of MCS-150 forms that will be used for extracting emails.")
     parser.add_argument("--invoices_dir", help="Directory of invoices that will be sent alongside MCS-150 forms.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes reading forms in parallel (default: number of CPUs).")
+    parser.add_argument("--no_cache", action="store_true", help="Read every form, instead of reusing the data of forms unchanged since they were last read.")
     return parser.parse_args()
 
 def main():
     args = term_parse()
 
+    # Imported once the arguments are parsed, so --help doesn't load pandas, PyPDFForm and rich
+    from mcs150.load import load_companies_from_forms
+    from config import Config
+    from log import log
+
     try:
-        df = load_companies_from_forms(args.mcs150_dir, args.invoices_dir)
+        df = load_companies_from_forms(args.mcs150_dir, args.invoices_dir,
+                                       cache_path=None if args.no_cache else Config.form_data_cache,
+                                       workers=args.workers)
         log.info(f"Using MCS-150 dir at: '{args.mcs150_dir}'.")
         log.info(f"Using invoices dir at: '{args.invoices_dir}'.")
         log.info(f"Saving extracted data to csv at: '{args.csv_path}'")
@@ -0,0 +1,115 @@
+import smtplib
+import ssl
+import time
+
+from log import log
+
+# Errors meaning the connection is gone, after which sending again on a new connection may succeed
+DROPPED_SESSION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+# "Service not available, closing transmission channel", sent by servers dropping idle or long-lived sessions
+SERVICE_CLOSING = 421
+
+
+class SMTPSession:
+    """
+    Authenticated SMTP connection for one inbox, kept open across `send_message` calls instead of
+    connecting, negotiating TLS and logging in for every message.
+
+    The connection is opened on the first message and replaced:
+        - after `max_messages` messages, since providers throttle or drop long-lived sessions
+        - when the server dropped it, detected by a NOOP after `idle_check` seconds without sending, or by
+          sending failing with a disconnect; the message is then sent once more on a fresh connection
+
+    Args:
+        login (str): Inbox login, also used as the default sender.
+        password (str | None): App password. None skips authentication, e.g. for a local SMTP sink.
+        host (str): SMTP server.
+        port (int): SMTP server port.
+        use_ssl (bool): Connect over implicit TLS (SMTPS), otherwise plain SMTP.
+        max_messages (int): Messages sent on one connection before it's replaced, 0 for no limit.
+        idle_check (float): Seconds without sending after which the connection is checked before use.
+        timeout (float): Socket timeout in seconds.
+    """
+
+    def __init__(self, login: str, password: str | None, host: str = "smtp.gmail.com", port: int = 465, use_ssl: bool = True,
+                 max_messages: int = 100, idle_check: float = 30, timeout: float = 60):
+        self.login = login
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.max_messages = max_messages
+        self.idle_check = idle_check
+        self.timeout = timeout
+
+        self._server = None
+        self._messages_on_connection = 0
+        self._last_used = 0.0
+        self.connections = 0
+        self.messages_sent = 0
+
+    def _connect(self) -> None:
+        self.close()
+        log.debug(f"Connecting to '{self.host}:{self.port}' for inbox '{self.login}'.")
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.password is not None:
+                server.login(self.login, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._messages_on_connection = 0
+        self._last_used = time.monotonic()
+        self.connections += 1
+
+    def _is_alive(self) -> bool:
+        try:
+            return self._server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _ensure_connected(self) -> None:
+        if self._server is None:
+            self._connect()
+        elif self.max_messages and self._messages_on_connection >= self.max_messages:
+            log.debug(f"Sent {self._messages_on_connection} messages from '{self.login}' on this connection, reconnecting.")
+            self._connect()
+        elif time.monotonic() - self._last_used > self.idle_check and not self._is_alive():
+            log.debug(f"SMTP session of '{self.login}' was dropped while idle, reconnecting.")
+            self._connect()
+
+    def send_message(self, msg) -> None:
+        """Sends an email message, (re)connecting as needed. Raises smtplib's errors if sending fails."""
+        self._ensure_connected()
+        try:
+            self._server.send_message(msg)
+        except (*DROPPED_SESSION_ERRORS, smtplib.SMTPResponseException) as e:
+            if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code != SERVICE_CLOSING:
+                raise
+            log.warning(f"SMTP session of '{self.login}' dropped while sending to '{msg['To']}' ({e}), reconnecting and retrying.")
+            self._connect()
+            self._server.send_message(msg)
+
+        self._messages_on_connection += 1
+        self.messages_sent += 1
+        self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
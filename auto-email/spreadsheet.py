@@ -1,6 +1,6 @@
 import pandas as pd
-from PyPDFForm import PdfWrapper
 
+from mcs150.load import index_forms_by_usdot
 from utils import load_paths_from_dir, normalize_name
 
 from config import Config
@@ -12,59 +12,63 @@ def normalize_headers(spreadsheet, header_map : dict | None = None) -> pd.DataFr
     return spreadsheet
 
 
-def attach_form_paths(companies: pd.DataFrame, forms_dir, invoices_dir) -> pd.DataFrame:
-    # Load paths from both directories
-    forms = load_paths_from_dir(forms_dir, '.pdf')
-    invoices = load_paths_from_dir(invoices_dir, '.pdf')
-
-    # Create a lookup for invoices based on normalized names
-    invoice_lookup = {normalize_name(inv): inv for inv in invoices}
-
-    # Initialize columns for form and invoice paths
-    company_form = ""
-    company_invoice = ""
-
-    # Iterate through companies to attach forms and invoices
-    for idx, company in companies.iterrows():
-        if not company['mcs150_last_update']:
-            continue
-        company_form = ""  # Reset form for each company
-        company_invoice = ""  # Reset invoice for each company
-        usdot = int(company['usdot']) 
-        # Iterate through forms to find the matching form
-        for form_path in forms:
-            form = PdfWrapper(form_path).data  # Extract form data
-            if str(usdot) != form.get("16usdotNumber"):
-                print(f"Form USDOT: {form.get("16usdotNumber")}")
-                print(f"Sheet USDOT: {usdot}")
-                continue
-            company_form = form_path
-            break  # Break after finding the first match
-        
-        # If no form was found, raise an error
-        if not company_form:
-            log.error(f"Forms not found for USDOT {usdot}")
-            continue
-
-        # Normalize company form name to use as key for invoice lookup
-        company_key = normalize_name(company_form)
-
-        # Look up the corresponding invoice path
-        company_invoice = invoice_lookup.get(company_key)
-
-        if not company_invoice:
-            log.error(f"Invoice not found for USDOT {usdot}")
-            continue
-
-        # Add the form and invoice paths to the company row
-        companies.loc[idx, 'form_path'] = company_form
-        companies.loc[idx, 'invoice_path'] = company_invoice
-        
+def attach_form_paths(companies: pd.DataFrame, forms_dir, invoices_dir, cache_path: str | None = Config.form_data_cache, workers: int | None = None) -> pd.DataFrame:
+    """
+    Sets the `form_path` and `invoice_path` of every company that has both an MCS-150 form and an invoice,
+    matching forms by USDOT and invoices by the form's file name.
+
+    Forms are indexed by USDOT once, so each form is read at most once (and not at all if it's in the
+    form data cache). Companies without a form or invoice, and USDOTs with several forms, are reported
+    as a summary.
+
+    Args:
+        companies (pd.DataFrame): Companies with `usdot` and `mcs150_last_update` columns.
+        forms_dir (str): Directory (or ZIP archive) of MCS-150 forms.
+        invoices_dir (str): Directory of invoices.
+        cache_path (str, optional): Path to the form data cache, None to read every form.
+        workers (int, optional): Number of processes extracting forms, defaults to the number of CPUs.
+    """
+    form_index = index_forms_by_usdot(forms_dir, cache_path, workers)
+    invoice_lookup = {normalize_name(inv): inv for inv in load_paths_from_dir(invoices_dir, '.pdf')}
+
+    duplicates = {usdot: forms for usdot, forms in form_index.items() if len(forms) > 1}
+    if duplicates:
+        log.warning(f"{len(duplicates)} USDOTs have more than one form, using the first one found: "
+                    + summarize(f"{usdot} ({len(forms)} forms)" for usdot, forms in duplicates.items()))
+
+    # Companies without an MCS-150 last update aren't matched
+    considered = companies['mcs150_last_update'].astype(bool)
+    usdots = pd.to_numeric(companies['usdot'], errors='coerce').astype('Int64').astype(str)
+
+    form_paths = usdots.map(lambda usdot: form_index.get(usdot, [None])[0]).where(considered)
+    invoice_paths = form_paths.map(lambda form: invoice_lookup.get(normalize_name(form)) if isinstance(form, str) else None)
+
+    missing_form = considered & form_paths.isna()
+    missing_invoice = form_paths.notna() & invoice_paths.isna()
+    if missing_form.any():
+        log.error(f"Forms not found for {missing_form.sum()} USDOTs: {summarize(companies['usdot'][missing_form])}")
+    if missing_invoice.any():
+        log.error(f"Invoices not found for {missing_invoice.sum()} USDOTs: {summarize(companies['usdot'][missing_invoice])}")
+
+    matched = form_paths.notna() & invoice_paths.notna()
+    companies.loc[matched, 'form_path'] = form_paths[matched]
+    companies.loc[matched, 'invoice_path'] = invoice_paths[matched]
+    log.info(f"Attached forms and invoices to {matched.sum()} of {considered.sum()} companies.")
+
     return companies
-        
-print(Config.spreadsheet)
-companies = normalize_headers(pd.read_csv(Config.spreadsheet), Config.sheet_to_df_map)
 
-print(companies.columns)
 
-print(attach_form_paths(companies, Config.mcs150_dir, Config.invoices_dir))
\ No newline at end of file
+def summarize(items, limit: int = 20) -> str:
+    """Joins the first `limit` items for a log message, noting how many more there are."""
+    items = list(items)
+    shown = ", ".join(str(item) for item in items[:limit])
+    return shown + (f" and {len(items) - limit} more" if len(items) > limit else "")
+
+
+if __name__ == "__main__":
+    print(Config.spreadsheet)
+    companies = normalize_headers(pd.read_csv(Config.spreadsheet), Config.sheet_to_df_map)
+
+    print(companies.columns)
+
+    print(attach_form_paths(companies, Config.mcs150_dir, Config.invoices_dir))
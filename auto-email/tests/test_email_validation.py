@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log import log
+from email_validation import AccountError, TransientError, emails_to_boolmap, new_session, verify_email
+from validity_store import EmailValidityStore
+
+
+class _APIHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        api = self.server
+        email = unquote(self.path.rsplit("/", 1)[-1])
+        with api.lock:
+            api.requests[email] += 1
+            replies = api.replies.get(email)
+            status, score = replies.pop(0) if replies else (200, 95)
+        body = json.dumps({"email": email, "score": score}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status in (429, 503):
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeValidationAPI(ThreadingHTTPServer):
+    """
+    Local stand-in for the email validation API, answering 200 with a score of 95 unless the replies
+    (status, score) for an email are scripted.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _APIHandler)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.replies = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v/{{email}}"
+
+
+class EmailValidationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeValidationAPI()
+        threading.Thread(target=self.api.serve_forever, daemon=True).start()
+        self.addCleanup(self.api.server_close)
+        self.addCleanup(self.api.shutdown)
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.store = EmailValidityStore(os.path.join(tmp_dir.name, "validity.db"))
+        self.addCleanup(self.store.close)
+
+    def validate(self, emails, workers=1):
+        return emails_to_boolmap(emails, 90, api_url=self.api.url, workers=workers, rate=1000, burst=1000, store=self.store)
+
+    def test_scores_and_rejected_emails_are_recorded(self):
+        self.api.replies = {"low@example.com": [(200, 40)], "bad@example.com": [(400, 0)]}
+
+        result = self.validate(["good@example.com", "low@example.com", "bad@example.com"])
+
+        expected = {"good@example.com": True, "low@example.com": False, "bad@example.com": False}
+        self.assertEqual(result, expected)
+        self.assertEqual(self.store.verdicts(expected), expected)
+
+    def test_account_errors_are_not_recorded_and_stop_validation(self):
+        for status in (401, 402, 403):
+            with self.subTest(status=status):
+                self.api.requests.clear()
+                emails = [f"first{status}@example.com", f"refused{status}@example.com", f"later{status}@example.com"]
+                self.api.replies = {emails[1]: [(status, 0)]}
+
+                with self.assertLogs(log, "CRITICAL"):
+                    result = self.validate(emails)
+
+                self.assertEqual(result, {emails[0]: True})
+                self.assertEqual(self.store.checked(emails), {emails[0]})
+                # Not sent once the API refused the account
+                self.assertEqual(self.api.requests[emails[2]], 0)
+
+    def test_emails_not_sent_after_an_account_error_get_no_verdict(self):
+        emails = [f"carrier{number}@example.com" for number in range(40)]
+        self.api.replies = {emails[5]: [(403, 0)]}
+
+        with self.assertLogs(log, "CRITICAL"):
+            result = self.validate(emails, workers=4)
+
+        self.assertNotIn(emails[5], self.store.checked(emails))
+        # Every verdict recorded came from a 200 with a passing score, none from the stopped requests
+        self.assertTrue(all(result.values()))
+        self.assertEqual(self.store.verdicts(emails), result)
+
+    def test_account_error_is_raised_by_verify_email(self):
+        self.api.replies = {"refused@example.com": [(401, 0)]}
+        session = new_session(1)
+        self.addCleanup(session.close)
+
+        with self.assertRaises(AccountError):
+            verify_email("refused@example.com", session, self.api.url)
+        self.assertEqual(self.api.requests["refused@example.com"], 1)
+
+    def test_transient_errors_are_retried(self):
+        self.api.replies = {"flaky@example.com": [(503, 0), (429, 0)]}
+
+        result = self.validate(["flaky@example.com"])
+
+        self.assertEqual(result, {"flaky@example.com": True})
+        self.assertEqual(self.api.requests["flaky@example.com"], 3)
+
+    def test_emails_failing_transiently_are_left_for_the_next_run(self):
+        self.api.replies = {"down@example.com": [(503, 0)] * 4}
+        session = new_session(1)
+        self.addCleanup(session.close)
+
+        with self.assertRaises(TransientError):
+            verify_email("down@example.com", session, self.api.url, retries=3)
+
+        self.api.replies = {"down@example.com": [(503, 0)] * 4}
+        result = self.validate(["down@example.com"])
+
+        self.assertEqual(result, {})
+        self.assertEqual(self.store.checked(["down@example.com"]), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import unittest
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log import log
+from smtp_session import SMTPSession
+
+# Reply to MAIL FROM that makes the sink hang up without answering
+DROP = None
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        self.reply("220 sink ready")
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-sink")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif command.startswith("AUTH"):
+                self.reply("235 Authentication succeeded")
+            elif command.startswith("MAIL"):
+                with sink.lock:
+                    reply = sink.mail_replies.pop(0) if sink.mail_replies else "250 OK"
+                if reply is DROP:
+                    return
+                self.reply(reply)
+                if reply.startswith("421"):
+                    return
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with sink.lock:
+                    sink.messages += 1
+                self.reply("250 Queued")
+                if sink.close_after_data:
+                    return
+            elif command == "NOOP":
+                with sink.lock:
+                    sink.noops += 1
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server accepting every message, whose replies to MAIL FROM can be scripted to make it
+    refuse a message, close the session with a 421 or drop the connection.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.noops = 0
+        # Replies to the next MAIL FROM commands, in order, then "250 OK"
+        self.mail_replies = []
+        # Hang up after every message, like a server dropping idle sessions
+        self.close_after_data = False
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+def message(number: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "sender@example.com"
+    msg["To"] = f"carrier{number}@example.com"
+    msg["Subject"] = f"Message {number}"
+    msg.set_content("Hello")
+    return msg
+
+
+class SMTPSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = SMTPSink()
+        threading.Thread(target=self.sink.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.sink.shutdown()
+        self.sink.server_close()
+
+    def session(self, **kwargs) -> SMTPSession:
+        session = SMTPSession("sender@example.com", "password", "127.0.0.1", self.sink.port, use_ssl=False, timeout=5, **kwargs)
+        self.addCleanup(session.close)
+        return session
+
+    def test_messages_reuse_one_connection(self):
+        session = self.session()
+        for number in range(3):
+            session.send_message(message(number))
+
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(self.sink.messages, 3)
+        self.assertEqual((session.connections, session.messages_sent), (1, 3))
+
+    def test_reconnects_after_max_messages(self):
+        session = self.session(max_messages=2)
+        for number in range(5):
+            session.send_message(message(number))
+
+        self.assertEqual(self.sink.connections, 3)
+        self.assertEqual(self.sink.messages, 5)
+
+    def test_idle_connection_is_checked_with_noop_and_kept(self):
+        session = self.session(idle_check=0)
+        session.send_message(message(1))
+        session.send_message(message(2))
+
+        self.assertEqual(self.sink.noops, 1)
+        self.assertEqual(self.sink.connections, 1)
+
+    def test_idle_connection_dropped_by_server_is_replaced(self):
+        self.sink.close_after_data = True
+        session = self.session(idle_check=0)
+        session.send_message(message(1))
+        with self.assertNoLogs(log, "WARNING"):
+            session.send_message(message(2))
+
+        self.assertEqual(self.sink.connections, 2)
+        self.assertEqual(self.sink.messages, 2)
+
+    def test_service_closing_is_retried_once_on_a_new_connection(self):
+        self.sink.mail_replies = ["250 OK", "421 Service not available, closing transmission channel"]
+        session = self.session()
+        session.send_message(message(1))
+        with self.assertLogs(log, "WARNING"):
+            session.send_message(message(2))
+
+        self.assertEqual(self.sink.connections, 2)
+        self.assertEqual(self.sink.messages, 2)
+        self.assertEqual(session.messages_sent, 2)
+
+    def test_dropped_connection_is_retried_once_on_a_new_connection(self):
+        self.sink.mail_replies = ["250 OK", DROP]
+        session = self.session()
+        session.send_message(message(1))
+        session.send_message(message(2))
+
+        self.assertEqual(self.sink.connections, 2)
+        self.assertEqual(self.sink.messages, 2)
+
+    def test_retry_is_not_repeated(self):
+        self.sink.mail_replies = ["421 Try again later", "421 Try again later"]
+        session = self.session()
+        with self.assertRaises(smtplib.SMTPResponseException) as raised:
+            session.send_message(message(1))
+
+        self.assertEqual(raised.exception.smtp_code, 421)
+        self.assertEqual(self.sink.connections, 2)
+        self.assertEqual(self.sink.messages, 0)
+
+    def test_refused_message_is_not_retried(self):
+        self.sink.mail_replies = ["550 Sender rejected"]
+        session = self.session()
+        with self.assertRaises(smtplib.SMTPSenderRefused):
+            session.send_message(message(1))
+
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(session.messages_sent, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
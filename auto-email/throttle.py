@@ -0,0 +1,48 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: tokens refill at `rate` per second up to `capacity`, and each call takes one,
+    so calls average out at `rate` per second while bursts of up to `capacity` go through at once. Matches
+    how API providers usually meter requests (N per second, or per minute, with some burst allowance).
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Most tokens the bucket holds, i.e. the largest burst. Starts full.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be a positive number of tokens per second.")
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float | None = None) -> bool:
+        """
+        Takes a token, waiting for one to refill if the bucket is empty. Tokens are reserved in call order,
+        so the bucket may go into debt and waiting threads are served first come, first served.
+
+        Args:
+            deadline (float, optional): `time.monotonic()` time by which the token must be available.
+
+        Returns:
+            bool: True once a token was taken, False (without taking one) if it wouldn't be available by `deadline`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if deadline is not None and now + wait > deadline:
+                return False
+            self._tokens -= 1
+
+        if wait > 0:
+            time.sleep(wait)
+        return True
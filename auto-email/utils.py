@@ -1,11 +1,11 @@
 import os
+import zipfile
 
 import smtplib
 import ssl
 import functools
 from pathlib import Path
 import argparse
-import json5
 
 from log import log
 
@@ -47,12 +47,56 @@ def normalize_name(file_path):
     return name.lower().replace(" ", "_")
 
 
+@functools.cache
+def open_archive(archive_path: str) -> zipfile.ZipFile:
+    """Opens a ZIP archive for reading once per process, so its member list is only parsed once."""
+    log.debug(f"Opening archive at: '{archive_path}'.")
+    return zipfile.ZipFile(archive_path)
+
+
+def split_archive_path(file_path: str) -> tuple[str, str] | None:
+    """Splits an `{archive}/{member}` path into the archive path and member name, or returns None for regular files."""
+    if os.path.isfile(file_path):
+        return None
+    archive_path, member = os.path.split(file_path)
+    if not zipfile.is_zipfile(archive_path):
+        return None
+    return archive_path, member
+
+
+def read_file_bytes(file_path: str) -> bytes:
+    """Reads a file's contents, whether it's a regular file or a member of a ZIP archive."""
+    archived = split_archive_path(str(file_path))
+    if archived:
+        archive_path, member = archived
+        return open_archive(archive_path).read(member)
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def file_signature(file_path: str) -> tuple[int, int]:
+    """
+    Returns a `(size, version)` pair that changes whenever the file's contents do: its modification time
+    (in ns) for regular files, or the CRC-32 of the member for files inside a ZIP archive.
+    """
+    archived = split_archive_path(str(file_path))
+    if archived:
+        archive_path, member = archived
+        info = open_archive(archive_path).getinfo(member)
+        return info.file_size, info.CRC
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
 def load_paths_from_dir(root_dir: str, file_extension : str | None = None) -> list[str]:
     """
     Recursively loads file paths from a directory, optionally filtered by file extension.
 
+    If `root_dir` is a ZIP archive (e.g. written by `auto_mcs150 --archive`), the paths of its members are
+    listed instead, as `{archive}/{member}` paths that `read_file_bytes` reads straight from the archive.
+
     Args:
-        root_dir (str): Root directory to search in.
+        root_dir (str): Root directory (or ZIP archive) to search in.
         file_extension (str, optional): File extension to filter by (e.g., '.pdf').
 
     Returns:
@@ -60,6 +104,12 @@ def load_paths_from_dir(root_dir: str, file_extension : str | None = None) -> li
     """
     paths: list[str] = []
 
+    if zipfile.is_zipfile(root_dir):
+        return [
+            os.path.join(root_dir, member) for member in open_archive(root_dir).namelist()
+            if not member.endswith("/") and (not file_extension or member.lower().endswith(file_extension.lower()))
+        ]
+
     for dirpath, _, filenames in os.walk(root_dir):
         log.debug(f"Visiting: '{dirpath}'")
         for filename in filenames:
@@ -122,20 +172,3 @@ def parse_duration(duration_str: str) -> int:
         else:
             raise argparse.ArgumentTypeError(f"Unknown duration unit in '{part}'")
     return total_seconds
-
-
-def save_email_bool_map(email_bool_map: dict, filepath: str, label: str = "email bool map") -> None:
-    """
-    Saves a dictionary of email validation results to a JSON5 file.
-
-    Args:
-        email_bool_map (dict): Dictionary mapping emails to bool (valid/invalid).
-        filepath (str): Path to save the JSON5 file.
-        label (str): Optional label for logging purposes.
-    """
-    try:
-        with open(filepath, "w") as f:
-            json5.dump(email_bool_map, f, indent=2)
-        log.info(f"Saved {len(email_bool_map)} entries to {label} at '{filepath}'.")
-    except Exception as e:
-        log.error(f"Failed to save {label} to '{filepath}': {e}")
\ No newline at end of file
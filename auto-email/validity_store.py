@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import time
+
+from log import log
+
+# SQLite's default limit on host parameters in one statement is 999 on older builds
+QUERY_BATCH_SIZE = 500
+
+
+class EmailValidityStore:
+    """
+    On-disk record of email verification results, one row per email keyed by the address and backed by SQLite.
+
+    Each result is committed as it's recorded, so a crash keeps every paid API call made before it. Nothing
+    is read when the store is opened; lookups only query the emails asked about, through the primary key,
+    so they cost the same however many emails were checked over time.
+
+    Verdicts older than a TTL count as unchecked, so addresses that went stale get verified again.
+
+    Domain verdicts (whether a domain exists at all) are kept the same way, in their own table.
+
+    Args:
+        path (str): Path to the SQLite database, created if it doesn't exist.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A commit per result; WAL with NORMAL sync keeps them cheap and still survives a crashing process
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS emails (
+                email TEXT PRIMARY KEY,
+                score INTEGER,
+                valid INTEGER NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY,
+                dead INTEGER NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        log.debug(f"Using email validity store at: '{path}'.")
+
+    @staticmethod
+    def _cutoff(ttl: float | None) -> float:
+        return time.time() - ttl if ttl else float("-inf")
+
+    def _select(self, columns: str, keys, ttl: float | None, table: str = "emails", key: str = "email"):
+        keys = list(keys)
+        cutoff = self._cutoff(ttl)
+        for start in range(0, len(keys), QUERY_BATCH_SIZE):
+            batch = keys[start:start + QUERY_BATCH_SIZE]
+            yield from self._conn.execute(
+                f"SELECT {columns} FROM {table} WHERE checked_at >= ? AND {key} IN ({', '.join('?' * len(batch))})",
+                (cutoff, *batch)
+            )
+
+    def checked(self, emails, ttl: float | None = None) -> set[str]:
+        """
+        Returns which of the emails have a verdict younger than `ttl` seconds (any verdict if `ttl` is None).
+        """
+        return {email for email, in self._select("email", emails, ttl)}
+
+    def verdicts(self, emails, ttl: float | None = None) -> dict[str, bool]:
+        """Returns email -> valid for the emails with a verdict younger than `ttl` seconds."""
+        return {email: bool(valid) for email, valid in self._select("email, valid", emails, ttl)}
+
+    def record(self, email: str, valid: bool, score: int | None = None, checked_at: float | None = None) -> None:
+        """
+        Stores the verdict for an email, replacing an older one, and commits it right away.
+
+        Args:
+            email (str): Verified email.
+            valid (bool): Whether the email is valid.
+            score (int, optional): Score the verification API gave, None if it rejected the email.
+            checked_at (float, optional): Unix time of the check, defaults to now.
+        """
+        self.record_many([(email, valid, score, checked_at)])
+
+    def record_many(self, results) -> None:
+        """
+        Stores verdicts in one transaction.
+
+        Args:
+            results (Iterable[tuple[str, bool, int | None, float | None]]): `(email, valid, score, checked_at)` tuples.
+        """
+        now = time.time()
+        rows = [(email, score, int(bool(valid)), checked_at or now) for email, valid, score, checked_at in results]
+        if not rows:
+            return
+        self._conn.executemany("INSERT OR REPLACE INTO emails (email, score, valid, checked_at) VALUES (?, ?, ?, ?)", rows)
+        self._conn.commit()
+
+    def domain_verdicts(self, domains, ttl: float | None = None) -> dict[str, bool]:
+        """Returns domain -> dead for the domains with a verdict younger than `ttl` seconds."""
+        rows = self._select("domain, dead", domains, ttl, table="domains", key="domain")
+        return {domain: bool(dead) for domain, dead in rows}
+
+    def record_domains(self, verdicts) -> None:
+        """
+        Stores domain verdicts in one transaction.
+
+        Args:
+            verdicts (Iterable[tuple[str, bool]]): `(domain, dead)` pairs.
+        """
+        now = time.time()
+        rows = [(domain, int(bool(dead)), now) for domain, dead in verdicts]
+        if not rows:
+            return
+        self._conn.executemany("INSERT OR REPLACE INTO domains (domain, dead, checked_at) VALUES (?, ?, ?)", rows)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
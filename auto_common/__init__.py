@@ -0,0 +1 @@
+"""Code shared by the AUTO tools, importable once the repository root is on sys.path."""
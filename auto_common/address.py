@@ -0,0 +1,133 @@
+import usaddress
+
+from functools import lru_cache
+import json
+import os
+import sqlite3
+import threading
+
+
+def normalize_address(address: str) -> str:
+    """Collapses whitespace so the same address typed with different spacing shares a cache entry."""
+    return " ".join(str(address).split())
+
+
+def parse_address(address: str) -> tuple[str, str, str, str]:
+    """
+    Splits a US address string into (street, city, state, zipcode) using usaddress.
+    """
+    parsed_address = usaddress.tag(address)[0]
+
+    street = []
+    for key, value in parsed_address.items():
+        if key == "PlaceName":
+            break
+        street.append(value) if value else street.append("")
+    street = " ".join(street)
+
+    city = parsed_address.get("PlaceName", "")
+    state = parsed_address.get("StateName", "")
+    zipcode = parsed_address.get("ZipCode", "")
+
+    return (street, city, state, zipcode)
+
+
+class AddressParser:
+    """
+    Memoizing front for `parse_address`: results are kept in an in-process LRU and, if `cache_path`
+    is given, in an SQLite file shared across runs, both keyed by the normalized address string.
+    """
+
+    def __init__(self, cache_path: str | None = None, maxsize: int = 65536):
+        self._conn = None
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS addresses (address TEXT PRIMARY KEY, parts TEXT NOT NULL)")
+            self._conn.commit()
+
+        self._split = lru_cache(maxsize=maxsize)(self._split_uncached)
+
+    def _load(self, keys: list[str]) -> dict[str, tuple]:
+        if not self._conn or not keys:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT address, parts FROM addresses WHERE address IN ({', '.join('?' * len(keys))})", keys
+            ).fetchall()
+        return {address: tuple(json.loads(parts)) for address, parts in rows}
+
+    def _save(self, parsed: dict[str, tuple]) -> None:
+        if not self._conn or not parsed:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO addresses (address, parts) VALUES (?, ?)",
+                [(address, json.dumps(parts)) for address, parts in parsed.items()]
+            )
+            self._unsaved += len(parsed)
+            if self._unsaved >= 100:
+                self._conn.commit()
+                self._unsaved = 0
+
+    def _split_uncached(self, key: str) -> tuple[str, str, str, str]:
+        stored = self._load([key])
+        if key in stored:
+            return stored[key]
+        parts = parse_address(key)
+        self._save({key: parts})
+        return parts
+
+    def split(self, address: str) -> tuple[str, str, str, str]:
+        """Splits one address into (street, city, state, zipcode). Raises whatever usaddress raises."""
+        if not isinstance(address, str):
+            return parse_address(address)  # Nothing worth caching, let usaddress reject it
+        return self._split(normalize_address(address))
+
+    def split_many(self, addresses) -> list[tuple[str, str, str, str] | None]:
+        """
+        Splits a whole column of addresses at once: each distinct address is parsed once, and the persistent
+        cache is read and written in bulk. Addresses that are missing or fail to parse come back as None.
+        """
+        keys = [normalize_address(address) if isinstance(address, str) else None for address in addresses]
+        distinct = [key for key in dict.fromkeys(keys) if key]
+
+        results = {None: None, "": None}
+        for i in range(0, len(distinct), 500):  # Stay under SQLite's bound parameter limit
+            results.update(self._load(distinct[i:i + 500]))
+
+        parsed = {}
+        for key in distinct:
+            if key in results:
+                continue
+            try:
+                parsed[key] = parse_address(key)
+            except Exception:
+                parsed[key] = None
+        self._save({key: parts for key, parts in parsed.items() if parts is not None})
+        results.update(parsed)
+
+        return [results[key] for key in keys]
+
+    def close(self) -> None:
+        if self._conn:
+            with self._lock:
+                self._conn.commit()
+                self._conn.close()
+            self._conn = None
+
+
+PARSER = AddressParser()
+
+
+def use_address_cache(cache_path: str) -> None:
+    """Switches the shared parser to one backed by a persistent cache at `cache_path`."""
+    global PARSER
+    PARSER = AddressParser(cache_path)
+
+
+def split_address(address: str) -> tuple[str, str, str, str]:
+    return PARSER.split(address)
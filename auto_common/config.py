@@ -0,0 +1,66 @@
+import json
+import os
+
+# Parsed copies of the tools' .jsonc files, kept as plain JSON alongside Python's own bytecode cache
+PARSED_CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__", "config")
+
+
+def load_jsonc(path, keep_parsed=True):
+    """
+    Loads a .jsonc file, reusing a parsed copy of it from PARSED_CONFIG_DIR while the file is unchanged.
+
+    json5 is slow to import and to parse with, so it's only used when the file changed since it was last
+    parsed; otherwise the plain JSON copy is read with the standard library.
+
+    Args:
+        path (str): Path to the .jsonc file.
+        keep_parsed (bool): Whether to keep a parsed copy. Off for secrets, which shouldn't be copied around.
+    """
+    if not keep_parsed:
+        import json5
+        with open(path) as f:
+            return json5.load(f)
+
+    stat = os.stat(path)
+    key = [stat.st_mtime_ns, stat.st_size]
+    # Keyed by the full path, as different directories hold files with the same name
+    cached_name = os.path.abspath(path).replace(os.sep, "%") + ".json"
+    cached_path = os.path.join(PARSED_CONFIG_DIR, cached_name)
+
+    try:
+        with open(cached_path) as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return cached["data"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    import json5
+    with open(path) as f:
+        data = json5.load(f)
+
+    try:
+        os.makedirs(PARSED_CONFIG_DIR, exist_ok=True)
+        tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "data": data}, f)
+        os.replace(tmp_path, cached_path)
+    except OSError:
+        # Read-only installs just parse the file every time
+        pass
+    return data
+
+
+class lazy:
+    """Class attribute computed on first access, then stored on the class in place of the descriptor."""
+
+    def __init__(self, load):
+        self.load = load
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.load()
+        setattr(owner, self.name, value)
+        return value
@@ -2,6 +2,7 @@ from docxtpl import DocxTemplate
 import pandas as pd
 
 from context import get_company_context
+from auto_common import address
 from utils import batch_convert_docx_to_pdf
 from log import log, MODULE_DIR
 
@@ -17,12 +18,16 @@ def extract_context_list(usdots: list[str], df: pd.DataFrame) -> list[dict]:
     Returns:
         list[dict]: A list of context dictionaries ready to be applied via docxtpl.
     """
+    # Split the addresses of all requested companies in one batch
+    wanted = df.loc[df.index.isin(usdots), "Physical Address"]
+    addresses = dict(zip(wanted.index, address.PARSER.split_many(wanted)))
+
     context_list = []
     for usdot in usdots:
         try:
             log.debug(f"Getting company context by USDOT '{usdot}'.")
             row = df.loc[usdot]
-            context = get_company_context(row)
+            context = get_company_context(row, addresses.get(usdot))
             context_list.append(context)
         
         except KeyError:
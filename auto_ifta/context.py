@@ -1,9 +1,9 @@
-from utils import split_address
+from auto_common.address import split_address
 
 
-def get_company_context(row):
-    # Get and split address
-    address = split_address(row["Physical Address"])
+def get_company_context(row, address=None):
+    # Get and split address, unless it was already split in bulk
+    address = address or split_address(row["Physical Address"])
 
     context = {
         # NEW SPREADSHEET SYNTAX
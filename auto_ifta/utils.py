@@ -1,5 +1,3 @@
-import usaddress
-
 import subprocess
 import os
 
@@ -41,23 +39,3 @@ def batch_convert_docx_to_pdf(folder_path):
 
     log.info(f"Conversion complete: {converted_count}/{total_files} '.docx' files converted.")
     return converted_count
-
-
-def split_address(address: str) -> tuple[str, str, str, str]:
-    """
-    Splits a US address string into (street, city, state, zipcode) using usaddress.
-    """
-    parsed_address = usaddress.tag(address)[0]
-
-    street = []
-    for key, value in parsed_address.items():
-        if key == "PlaceName":
-            break
-        street.append(value) if value else street.append("")
-    street = " ".join(street)
-
-    city = parsed_address.get("PlaceName", "")
-    state = parsed_address.get("StateName", "")
-    zipcode = parsed_address.get("ZipCode", "")
-
-    return (street, city, state, zipcode)
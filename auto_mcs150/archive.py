@@ -0,0 +1,171 @@
+import csv
+import glob
+import json
+import os
+import shutil
+import time
+import zipfile
+
+from log import log
+
+
+class FormArchive:
+    """
+    Single ZIP archive that filled forms are streamed into, instead of one file per company. Each form is
+    stored as a member named like the file it would otherwise be written to, and listed in a sidecar CSV
+    index (`{archive}.index.csv`) mapping its USDOT to the member name.
+
+    Forms in the archive are addressed by virtual paths, `{archive path}/{member name}`, so they can be
+    journaled and later read back like regular files.
+
+    A ZIP archive is only readable once its central directory is written, and appending to one writes over
+    its old directory, so forms aren't added to the archive in place. They're written to segments, small
+    archives of `checkpoint_every` forms each (`{archive}.segment-NNNNN`), every one finished under a
+    temporary name and then renamed, so a segment on disk is always complete. On close, the archive and
+    its segments are merged into a new copy that replaces the archive in one step, and the index is
+    rebuilt from it. The archive at `path` and its index are therefore always readable and in agreement.
+
+    A crash loses at most the forms of the unfinished segment: resuming picks up the finished segments,
+    skips their forms, and merges them in on close.
+    """
+    INDEX_SUFFIX = ".index.csv"
+    SEGMENT_SUFFIX = ".segment-"
+    INDEX_COLUMNS = ("usdot", "legal_name", "member")
+
+    def __init__(self, path: str, resume: bool = False, checkpoint_every: int = 500):
+        self.path = path
+        self.index_path = path + self.INDEX_SUFFIX
+        self.checkpoint_every = checkpoint_every
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        for leftover in glob.glob(glob.escape(path) + "*.tmp"):
+            os.remove(leftover)
+
+        # Whether the forms already in the archive are kept; otherwise it's replaced by this run's forms on close
+        self._keep_archive = resume and os.path.exists(path)
+        if self._keep_archive and not zipfile.is_zipfile(path):
+            broken = path + ".broken"
+            os.replace(path, broken)
+            log.warning(f"Archive at '{path}' is unreadable. Moved it to '{broken}', starting a new one.")
+            self._keep_archive = False
+
+        self._segments = sorted(glob.glob(glob.escape(path + self.SEGMENT_SUFFIX) + "[0-9]" * 5))
+        if not resume:
+            for segment in self._segments:
+                os.remove(segment)
+            self._segments = []
+
+        self.members = set()
+        for archive in ([path] if self._keep_archive else []) + self._segments:
+            with zipfile.ZipFile(archive) as z:
+                self.members.update(z.namelist())
+
+        self._segment = None
+        self._segment_forms = 0
+        self._next_segment = int(self._segments[-1][-5:]) + 1 if self._segments else 0
+        log.debug(f"Writing filled forms to archive at '{path}' ({len(self.members)} forms already in it or its segments).")
+
+    def _open(self, path: str, mode: str) -> zipfile.ZipFile:
+        # Filled forms compress well, but favour speed since the archive is written from the main process
+        return zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+
+    @staticmethod
+    def _sync(path: str) -> None:
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+    def member_name(self, path: str) -> str | None:
+        """Returns the member name a virtual path points to, or None if it doesn't point into this archive."""
+        archive, member = os.path.split(path)
+        if os.path.abspath(archive) != os.path.abspath(self.path):
+            return None
+        return member
+
+    def exists(self, path: str) -> bool:
+        """`os.path.exists` that also sees forms stored in the archive or its segments."""
+        member = self.member_name(path)
+        return member in self.members if member is not None else os.path.exists(path)
+
+    def add(self, path: str, data: bytes, usdot = "", legal_name = "") -> None:
+        """Stores a filled form's bytes under the member its virtual `path` points to."""
+        member = self.member_name(path)
+        if member is None:
+            raise ValueError(f"'{path}' doesn't point into the archive at '{self.path}'.")
+
+        if self._segment is None:
+            segment_path = f"{self.path}{self.SEGMENT_SUFFIX}{self._next_segment:05d}"
+            self._segment = self._open(segment_path + ".tmp", "w")
+            self._next_segment += 1
+
+        # The USDOT and name go along with the form, so the index can be rebuilt from the forms themselves
+        info = zipfile.ZipInfo(member, date_time=time.localtime()[:6])
+        info.external_attr = 0o600 << 16
+        info.comment = json.dumps([usdot, legal_name]).encode()
+        self._segment.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.members.add(member)
+        self._segment_forms += 1
+
+        if self._segment_forms >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Finishes the current segment, making every form added so far durable and readable."""
+        if self._segment is None:
+            return
+        self._segment.close()
+        tmp_path = self._segment.filename
+        self._sync(tmp_path)
+        segment_path = tmp_path.removesuffix(".tmp")
+        os.replace(tmp_path, segment_path)
+        self._segments.append(segment_path)
+        self._segment = None
+        self._segment_forms = 0
+
+    def close(self) -> None:
+        """Merges the segments into the archive, replacing it and its index in one step each."""
+        self.checkpoint()
+        if self._keep_archive and not self._segments and os.path.exists(self.index_path):
+            return
+
+        tmp_path = self.path + ".tmp"
+        if self._keep_archive:
+            # Copying the archive as is and appending to the copy leaves the archive readable throughout
+            shutil.copyfile(self.path, tmp_path)
+        else:
+            self._open(tmp_path, "w").close()
+
+        with self._open(tmp_path, "a") as merged:
+            for segment in self._segments:
+                with zipfile.ZipFile(segment) as z:
+                    for info in z.infolist():
+                        copy = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                        copy.external_attr = info.external_attr
+                        copy.comment = info.comment
+                        merged.writestr(copy, z.read(info), compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._sync(tmp_path)
+        os.replace(tmp_path, self.path)
+
+        self._write_index()
+        for segment in self._segments:
+            os.remove(segment)
+        log.debug(f"Merged {len(self._segments)} segments into the archive at '{self.path}'.")
+        self._segments = []
+
+    def _write_index(self) -> None:
+        """Rewrites the index from the archive, so it lists exactly the forms that are in it."""
+        # Archives written before members had comments only have their USDOT and name in the old index
+        indexed = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, newline="") as f:
+                indexed = {row["member"]: (row["usdot"], row["legal_name"]) for row in csv.DictReader(f)}
+
+        tmp_path = self.index_path + ".tmp"
+        with zipfile.ZipFile(self.path) as archive, open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.INDEX_COLUMNS)
+            for info in archive.infolist():
+                usdot, legal_name = json.loads(info.comment) if info.comment else indexed.get(info.filename, ("", ""))
+                writer.writerow((usdot, legal_name, info.filename))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
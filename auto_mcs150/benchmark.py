@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the auto_mcs150 pipeline offline, against a local fake SAFER server (see `fake_safer.py`).
+
+For each scale, synthetic USDOT lists and contact spreadsheets are generated, then companies are fetched,
+filtered and a sample of their forms is filled, each stage timed separately. Results are saved as JSON,
+and can be compared against an earlier run with --compare.
+
+    python benchmark.py --scales 1k 10k --latency 0.05 --compare data/benchmarks/<earlier run>.json
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+
+from config import Config, MODULE_DIR
+from log import log
+
+BENCHMARKS_DIR = f"{MODULE_DIR}/data/benchmarks"
+
+# Metrics compared by --compare, and whether higher is better
+COMPARED_METRICS = {
+    "fetch_per_second": True,
+    "filter_seconds": False,
+    "fill_p50_ms": False,
+    "fill_p99_ms": False,
+    "forms_per_second": True,
+    "peak_rss_mb": False,
+    "total_seconds": False,
+}
+
+
+def parse_scale(scale: str) -> int:
+    """Parses scales like '1k', '10k' or '2500' into a number of USDOTs."""
+    scale = scale.lower().strip()
+    return int(float(scale[:-1]) * 1000) if scale.endswith("k") else int(scale)
+
+
+def generate_inputs(directory: str, size: int, seed: int = 0) -> tuple[str, str]:
+    """
+    Writes a synthetic USDOT list and a contact spreadsheet covering most of its USDOTs, including a few
+    duplicate rows, into `directory`.
+
+    Returns:
+        tuple[str, str]: Paths to the USDOT CSV and the contact spreadsheet.
+    """
+    rng = random.Random(seed)
+    usdots = rng.sample(range(1_000_000, 4_000_000), size)
+
+    usdots_path = os.path.join(directory, "usdots.csv")
+    with open(usdots_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["usdot"])
+        writer.writerows([usdot] for usdot in usdots)
+
+    contacts_path = os.path.join(directory, "contacts.csv")
+    with open(contacts_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["DOT#", "Contact Name", "email"])
+        for usdot in usdots:
+            if rng.random() < 0.7:
+                row = [usdot, f"JOHN {usdot} DOE", f"owner{usdot}@example.com"]
+                writer.writerow(row)
+                if rng.random() < 0.01:
+                    writer.writerow(row)
+
+    return usdots_path, contacts_path
+
+
+class Timed:
+    """Iterator wrapper adding up the time spent producing items, and counting them (and the None ones)."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.seconds = 0.0
+        self.count = 0
+        self.none_count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            item = next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.count += 1
+        self.none_count += item is None
+        return item
+
+
+def percentiles(values: list[float]) -> dict[str, float | None]:
+    """p50/p90/p99/max of the values, in milliseconds."""
+    if len(values) < 2:
+        value = values[0] * 1000 if values else None
+        return {"p50": value, "p90": value, "p99": value, "max": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49] * 1000, "p90": cuts[89] * 1000, "p99": cuts[98] * 1000, "max": max(values) * 1000}
+
+
+def peak_rss_mb(who = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size in MB, of this process or (with RUSAGE_CHILDREN) its largest finished child (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def run_scale(size: int, settings: dict) -> dict:
+    """Runs one benchmark at the given number of USDOTs. Meant to run in a fresh process, so peak RSS is its own."""
+    from fake_safer import FakeSafer
+    from fetch import set_safer_url, use_backend
+    from loading import iter_companies_from_csv
+    from filtering import iter_filtered_companies, FILTER_STATS
+    from sheet import load_contact_index
+    from template import FormTemplate
+    from forms import FormPaths, write_forms
+
+    if settings["quiet"]:
+        log.setLevel(logging.ERROR)
+
+    server = FakeSafer(settings["latency"], settings["error_rate"], settings["not_found_rate"], seed=settings["seed"])
+    set_safer_url(server.start())
+    use_backend(settings["backend"], pool_size=settings["fetch_workers"])
+
+    total_start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        usdots_path, contacts_path = generate_inputs(directory, size, settings["seed"])
+
+        start = time.perf_counter()
+        contact_index = load_contact_index(contacts_path)
+        contacts_seconds = time.perf_counter() - start
+
+        fetched = Timed(iter_companies_from_csv(usdots_path, settings["max_retries"], 0,
+                                                workers=settings["fetch_workers"],
+                                                rate_limit=settings["rate_limit"] or None,
+                                                max_rate_limit=settings["max_rate_limit"] or None))
+        passed = Timed(iter_filtered_companies(fetched, before=settings["before"]))
+
+        sample = []
+        for company in passed:
+            if len(sample) < settings["max_forms"]:
+                sample.append(company)
+
+        # Filtering pulls companies from the fetch stage, so its own time is what's left after fetching
+        filter_seconds = passed.seconds - fetched.seconds
+        server.stop()
+
+        template = FormTemplate(Config.MCS150_TEMPLATE_PATH)
+        form_paths = FormPaths(os.path.join(directory, "forms"))
+        os.makedirs(form_paths.output_dir)
+        jobs = ((company, form_paths.path_for(company), None) for company in sample)
+
+        # Per-form latencies, timed in the workers; the wall time over all forms gives the throughput
+        latencies = []
+        fill_errors = 0
+        fill_start = time.perf_counter()
+        for _, _, error in write_forms(jobs, template, contact_index, settings["workers"], timings=latencies):
+            fill_errors += bool(error)
+        fill_seconds = time.perf_counter() - fill_start
+
+    fill = percentiles(latencies)
+    return {
+        "usdots": size,
+        "contacts_seconds": contacts_seconds,
+        "fetched": fetched.count - fetched.none_count,
+        "not_found": fetched.none_count,
+        "fetch_failed": size - fetched.count,
+        "fetch_seconds": fetched.seconds,
+        "fetch_per_second": fetched.count / fetched.seconds if fetched.seconds else None,
+        "safer_requests": server.requests,
+        "safer_errors": server.errors,
+        "filter_seconds": filter_seconds,
+        "passed_filters": passed.count,
+        "filtered_out": dict(FILTER_STATS),
+        "forms_filled": len(latencies) - fill_errors,
+        "fill_errors": fill_errors,
+        "fill_seconds": fill_seconds,
+        "fill_p50_ms": fill["p50"],
+        "fill_p90_ms": fill["p90"],
+        "fill_p99_ms": fill["p99"],
+        "fill_max_ms": fill["max"],
+        "forms_per_second": len(latencies) / fill_seconds if fill_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        # Includes the fake SAFER server as well as any form filling workers
+        "peak_child_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "total_seconds": time.perf_counter() - total_start,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=MODULE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(previous: dict, current: dict) -> None:
+    """Logs the change of the main metrics between two benchmark runs, scale by scale."""
+    previous_results = {result["usdots"]: result for result in previous["results"]}
+    log.info(f"Compared to the run of {previous.get('timestamp')} (commit {previous.get('commit')}):")
+    for result in current["results"]:
+        before = previous_results.get(result["usdots"])
+        if not before:
+            log.info(f"  {result['usdots']} USDOTs: no earlier result.")
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            better = change > 0 if higher_is_better else change < 0
+            changes.append(f"{metric} {old:.2f} -> {new:.2f} ({change:+.1f}%{', better' if better and abs(change) >= 1 else ''})")
+        log.info(f"  {result['usdots']} USDOTs: " + "; ".join(changes))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark auto_mcs150 against a local fake SAFER server.")
+    parser.add_argument("--scales", nargs="+", default=["1k"], help="Numbers of USDOTs to benchmark with, e.g. 1k 10k 100k (default: 1k)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the fake SAFER takes per request (default: 0)")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Share of fake SAFER requests failing with 503 (default: 0)")
+    parser.add_argument("--not_found_rate", type=float, default=0.05, help="Share of USDOTs the fake SAFER doesn't know (default: 0.05)")
+    parser.add_argument("--backend", choices=["safer", "lite"], default="safer", help="SAFER client backend (default: safer)")
+    parser.add_argument("--fetch_workers", type=int, default=8, help="SAFER requests kept in flight (default: 8)")
+    parser.add_argument("--rate_limit", type=float, default=0, help="SAFER requests per second, 0 for no limit (default: 0)")
+    parser.add_argument("--max_rate_limit", type=float, default=0, help="Ceiling for the adapting request rate, 0 to keep it fixed (default: 0)")
+    parser.add_argument("--max_retries", type=int, default=3, help="Retries of failed SAFER requests (default: 3)")
+    parser.add_argument("--before", default="01.01.2024", help="MCS-150 update cutoff for filtering (default: 01.01.2024)")
+    parser.add_argument("--workers", type=int, default=1, help="Form filling processes (default: 1)")
+    parser.add_argument("--max_forms", type=int, default=50, help="Forms filled per scale, sampled from the companies that pass the filters (default: 50)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data (default: 0)")
+    parser.add_argument("--quiet", action="store_true", help="Only log errors from the pipeline while benchmarking.")
+    parser.add_argument("--output", default=None, help=f"Path of the JSON results (default: {BENCHMARKS_DIR}/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier JSON results to compare against.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    settings = vars(args)
+    timestamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
+
+    run = {
+        "timestamp": timestamp,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": settings,
+        "results": [],
+    }
+
+    for scale in args.scales:
+        size = parse_scale(scale)
+        log.info(f"Benchmarking with {size} USDOTs...")
+        # A fresh process per scale, so each gets its own peak RSS and cold caches
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            result = executor.submit(run_scale, size, settings).result()
+        run["results"].append(result)
+        log.info(f"{size} USDOTs: {result['fetch_per_second'] or 0:.1f} fetches/s, filtering took {result['filter_seconds']:.2f}s, "
+                 + f"fill p50/p99 {result['fill_p50_ms'] or 0:.0f}/{result['fill_p99_ms'] or 0:.0f} ms, {result['forms_per_second'] or 0:.2f} forms/s, "
+                 + f"peak RSS {result['peak_rss_mb']:.0f} MB.")
+
+    output = args.output or os.path.join(BENCHMARKS_DIR, f"{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    log.info(f"Saved benchmark results at '{output}'.")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), run)
+
+
+if __name__ == "__main__":
+    main()
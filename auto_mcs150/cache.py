@@ -0,0 +1,95 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from log import log
+
+
+DAY = 24 * 60 * 60
+
+
+class SnapshotCache:
+    """
+    On-disk store of raw SAFER company snapshots keyed by USDOT, backed by SQLite.
+
+    Each entry keeps the raw snapshot dictionary (as returned by `Company.to_dict()`) and the time it was
+    fetched. USDOTs that SAFER reported as not found are stored with empty data and expire after
+    their own, usually shorter, TTL.
+    """
+
+    def __init__(self, path: str, ttl_days: float = 30, not_found_ttl_days: float = 3):
+        self.path = path
+        self.ttl = ttl_days * DAY
+        self.not_found_ttl = not_found_ttl_days * DAY
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                usdot TEXT PRIMARY KEY,
+                data TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        log.debug(f"Using SAFER snapshot cache at: '{path}'.")
+
+    def get(self, usdot) -> tuple[bool, dict | None]:
+        """
+        Looks up a fresh snapshot for the USDOT.
+
+        Returns:
+            tuple[bool, Optional[dict]]: `(True, data)` on a fresh hit, where `data` is None for a cached
+                                         "not found" result, or `(False, None)` on a miss or expired entry.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, fetched_at FROM snapshots WHERE usdot = ?", (str(usdot),)
+            ).fetchone()
+
+        if row is None:
+            return False, None
+
+        data, fetched_at = row
+        ttl = self.ttl if data is not None else self.not_found_ttl
+        if time.time() - fetched_at > ttl:
+            return False, None
+
+        return True, json.loads(data) if data is not None else None
+
+    def stored_form_dates(self, usdots) -> dict[str, str]:
+        """
+        Looks up the MCS-150 form date of every stored snapshot among `usdots`, however old the snapshot is.
+
+        Returns:
+            dict[str, str]: USDOT -> raw MCS-150 form date, for the USDOTs with a stored snapshot that has one.
+        """
+        usdots = [str(usdot) for usdot in usdots]
+        dates = {}
+        for i in range(0, len(usdots), 500):  # Stay under SQLite's bound parameter limit
+            chunk = usdots[i:i + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT usdot, json_extract(data, '$.mcs_150_form_date') FROM snapshots "
+                    + f"WHERE data IS NOT NULL AND usdot IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            dates.update((usdot, date) for usdot, date in rows if date)
+        return dates
+
+    def put(self, usdot, data: dict | None) -> None:
+        """Stores a snapshot for the USDOT, or a "not found" result if `data` is None."""
+        serialized = json.dumps(data, default=str) if data is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (usdot, data, fetched_at) VALUES (?, ?, ?)",
+                (str(usdot), serialized, time.time())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -6,11 +6,28 @@ def parse_arguments():
     parser.add_argument("usdots_path",help="Path to a .csv file containing the USDOT numbers to be processed.")
     parser.add_argument("--usdot_column", default=None, help="The name of the column containing usdots in the .csv provided.")
     parser.add_argument("--output_dir", default=None, help="Output directory for the filled-out forms.")
+    parser.add_argument("--archive", default=None, help="Stream the filled-out forms into a single ZIP archive at this path instead of one PDF per company in the output directory.")
     parser.add_argument("--path_to_mcs150_template", default=None, help="Path to the MCS-150 form template.")
     parser.add_argument("--before", default=None, help="Include only companies that updated their MCS-150 before the given date.")
     parser.add_argument("--accept_out_of_service", action="store_true", default=False, help="Accept companies that are out of service. False by default.")
-    parser.add_argument('--max_retries', type=int, default=0, help='Max retries in case of SSLError (default: 0)')
+    parser.add_argument('--max_retries', type=int, default=0, help='Max retries in case SAFER is unreachable or pushing back (default: 0)')
     parser.add_argument('--time_before_retry', type=int, default=0, help='Seconds to wait before retrying (default: 0)')
+    parser.add_argument('--fetch_workers', type=int, default=4, help='Number of SAFER requests kept in flight at once (default: 4)')
+    parser.add_argument('--rate_limit', type=float, default=2.0, help='SAFER requests started per second, 0 for no limit. The starting rate when adapting (default: 2)')
+    parser.add_argument('--max_rate_limit', type=float, default=8.0, help='Ceiling the SAFER request rate may adapt up to while requests succeed, 0 to keep --rate_limit fixed (default: 8)')
+    parser.add_argument('--breaker_threshold', type=int, default=5, help='Consecutive failed SAFER requests that pause all workers, 0 to never pause (default: 5)')
+    parser.add_argument('--breaker_cooldown', type=float, default=60, help='Seconds all workers pause for once SAFER looks down (default: 60)')
+    parser.add_argument('--backend', choices=["safer", "lite"], default="safer", help="SAFER client: 'safer' builds full snapshots with the safer library, 'lite' keeps pooled keep-alive connections and parses only the fields used for the forms (default: safer)")
+    parser.add_argument('--safer_url', default=None, help="Alternative SAFER query endpoint, e.g. a local fake SAFER server for testing.")
+    parser.add_argument('--cache_path', default=None, help="Path to the SAFER snapshot cache (SQLite). Defaults to SNAPSHOT_CACHE_PATH in 'config.py'.")
+    parser.add_argument('--cache_ttl', type=float, default=None, help="Days a cached snapshot stays fresh. Defaults to SNAPSHOT_TTL_DAYS in 'config.py'.")
+    parser.add_argument('--not_found_ttl', type=float, default=None, help="Days a cached 'not found' result stays fresh. Defaults to NOT_FOUND_TTL_DAYS in 'config.py'.")
+    parser.add_argument('--refresh', action="store_true", default=False, help="Ignore cached snapshots and re-fetch every company from SAFER.")
+    parser.add_argument('--no_cache', action="store_true", default=False, help="Don't read or write the snapshot and address caches.")
+    parser.add_argument('--queue_size', type=int, default=64, help='Maximum number of companies buffered between the fetch, filter and fill stages (default: 64)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes filling and writing forms in parallel (default: 1)')
+    parser.add_argument('--resume', action="store_true", default=False, help="Continue an interrupted run from its journal in the output directory, skipping completed companies and existing forms.")
+    parser.add_argument('--incremental', action="store_true", default=False, help="Only regenerate forms whose field values changed since they were last written to the output directory.")
     parser.add_argument('--spreadsheet_path', default=None, help="Path to the spreadsheet used for appending company contact info (eg. email) to a form.")
 
     return parser.parse_args()
\ No newline at end of file
@@ -1,17 +1,64 @@
-from safer.search import Company
-from PyPDFForm import PdfWrapper
-import pandas as pd
-
 import json
-from dataclasses import dataclass, field
+from collections import Counter
+from dataclasses import dataclass, fields as dataclass_fields
+from functools import cache
+from typing import TYPE_CHECKING
 
 from config import Config
-from utils import split_address
+from auto_common.address import split_address
 from log import log
 
 from sheet import append_sheet_to_fields_map
 
-@dataclass
+if TYPE_CHECKING:
+    # Only needed for annotations; form filling workers don't load safer at all
+    from safer.search import Company
+    from PyPDFForm import PdfWrapper
+
+# Operation, classification and cargo values of companies seen this run that have no checkbox in FIELDS_MAP_BOXES
+UNKNOWN_BOX_VALUES = Counter()
+
+
+@dataclass(frozen=True, slots=True)
+class FieldPlan:
+    """
+    SimpleCompany attribute -> MCS-150 form field mapping, flattened from the Config field maps.
+
+    text: (attribute, text field) pairs
+    addresses: (attribute, address fields) pairs, filled by zipping with the address tuple
+    box_attributes: attributes holding values that map to checkboxes through `boxes`
+    """
+    text: tuple[tuple[str, str], ...]
+    addresses: tuple[tuple[str, tuple[str, ...]], ...]
+    box_attributes: tuple[str, ...]
+    boxes: dict[str, str]
+
+
+@cache
+def field_plan() -> FieldPlan:
+    """Compiles the Config field maps into a FieldPlan for SimpleCompany, once per process."""
+    text, addresses, box_attributes = [], [], []
+
+    for attribute in (f.name for f in dataclass_fields(SimpleCompany)):
+        if attribute in Config.FIELDS_MAP_TEXT:
+            text.append((attribute, Config.FIELDS_MAP_TEXT[attribute]))
+        elif attribute in Config.FIELDS_MAP_ADDRESSES:
+            addresses.append((attribute, tuple(Config.FIELDS_MAP_ADDRESSES[attribute])))
+        else:
+            box_attributes.append(attribute)
+
+    return FieldPlan(tuple(text), tuple(addresses), tuple(box_attributes), dict(Config.FIELDS_MAP_BOXES))
+
+
+def log_unknown_box_values() -> None:
+    """Logs a one-time summary of the values counted in UNKNOWN_BOX_VALUES."""
+    if not UNKNOWN_BOX_VALUES:
+        return
+    summary = ", ".join(f"'{value}' ({count})" for value, count in UNKNOWN_BOX_VALUES.most_common())
+    log.warning(f"Values not in any of the field maps were left off the forms: {summary}")
+
+
+@dataclass(slots=True)
 class SimpleCompany():
     """
     Representation of a Company object filtered down to only the attributes required to fill an MCS-150 form,
@@ -20,17 +67,17 @@ class SimpleCompany():
     legal_name: str
     dba_name: str = ""
     usdot: str = ""
-    physical_address: tuple = field(default_factory=tuple)
-    mailing_address: tuple = field(default_factory=tuple)
+    physical_address: tuple = ()
+    mailing_address: tuple = ()
     phone: str = ""
     mc: str = ""
     mileage: str = "0"
-    operations: list = field(default_factory=list)
-    operation_classifications: list = field(default_factory=list)
-    cargo_carried: list = field(default_factory=list)
+    operations: tuple = ()
+    operation_classifications: tuple = ()
+    cargo_carried: tuple = ()
 
     @classmethod
-    def from_company(cls, company: Company) -> "SimpleCompany":
+    def from_company(cls, company: "Company") -> "SimpleCompany":
         physical_address, mailing_address = (), ()
         try:
             physical_address = split_address(company.physical_address)
@@ -39,7 +86,7 @@ class SimpleCompany():
         except Exception as e:
             log.warning(f"Error when splitting address for '{company.legal_name}' (USDOT {company.usdot}): {e}")
 
-        return cls(
+        simple_company = cls(
             legal_name=company.legal_name,
             dba_name=company.dba_name or "",
             usdot=str(company.usdot),
@@ -48,68 +95,68 @@ class SimpleCompany():
             phone=company.phone_number or "",
             mc=company.mc_mx_ff_numbers.strip('-') if company.mc_mx_ff_numbers else "",
             mileage=f"{company.mcs_150_mileage_year['mileage']:,}" if company.mcs_150_mileage_year["mileage"] else "0",
-            operations=company.carrier_operation or [],
-            operation_classifications=company.operation_classification or [],
-            cargo_carried=company.cargo_carried or []
+            operations=tuple(company.carrier_operation or ()),
+            operation_classifications=tuple(company.operation_classification or ()),
+            cargo_carried=tuple(company.cargo_carried or ())
         )
 
+        # Tally values without a checkbox here rather than at fill time, which may run in worker processes
+        boxes = field_plan().boxes
+        for attribute in field_plan().box_attributes:
+            for value in getattr(simple_company, attribute):
+                if value not in boxes:
+                    UNKNOWN_BOX_VALUES[value] += 1
+                    log.debug(f"{value} property of Company {simple_company.legal_name} (USDOT: {simple_company.usdot}) is not in any of the field maps.")
+
+        return simple_company
+
 
     def map_to_form_fields(self) -> dict:
         """
         Maps SimpleCompany instance to a dictionary of MCS-150 form fields and their corresponding values.
 
-        Uses Config mappings:
+        Follows the FieldPlan compiled from the Config mappings:
             - FIELDS_MAP_TEXT: property name to form text field
             - FIELDS_MAP_ADDRESSES: property name to tuple of form address fields
-            - FIELDS_MAP_BOXES: operation codes to checkbox fields
+            - FIELDS_MAP_BOXES: operation codes to checkbox fields (values without one are skipped)
         """
-        fields = {}
-
-        for _property, value in self.__dict__.items():
-            # Handle mappings based on Config.FIELDS_MAP_TEXT
-            if _property in Config.FIELDS_MAP_TEXT:
-                fields[Config.FIELDS_MAP_TEXT.get(_property)] = value
-                continue
-
-            # Handle address fields using Config.FIELDS_MAP_ADDRESSES
-            if _property in Config.FIELDS_MAP_ADDRESSES:
-                addr_category = Config.FIELDS_MAP_ADDRESSES.get(_property)
-                addr = value
-                fields.update({
-                    field: addr_component
-                    for field, addr_component in zip(addr_category, addr)
-                })
-                continue
-
-            # Handle box fields using Config.FIELDS_MAP_BOXES
-            for v in value:
-                if v not in Config.FIELDS_MAP_BOXES:
-                    log.warning(f"{v} property of Company {self.legal_name} (USDOT: {self.usdot}) is not in any of the field maps.")
-                    continue
-
-                field = Config.FIELDS_MAP_BOXES.get(v)
-                fields[field] = True
+        plan = field_plan()
+        fields = {form_field: getattr(self, attribute) for attribute, form_field in plan.text}
+
+        for attribute, address_fields in plan.addresses:
+            fields.update(zip(address_fields, getattr(self, attribute)))
+
+        boxes = plan.boxes
+        for attribute in plan.box_attributes:
+            for value in getattr(self, attribute):
+                form_field = boxes.get(value)
+                if form_field is not None:
+                    fields[form_field] = True
 
         return fields
 
 
-    def filled_form(self, mcs150_template_path, spreadsheet_path) -> PdfWrapper:
-        log.debug(f"Filling MCS-150 Form for company '{self.legal_name}' (USDOT: {self.usdot})'...")
-        form = PdfWrapper(mcs150_template_path)
+    def form_fields(self, contact_index) -> dict:
+        """Returns every MCS-150 form field value for the company: its mapped fields plus its spreadsheet contact info."""
         filled_fields = self.map_to_form_fields()
 
         # "There is nothing more permanent than a temporary solution"
         # TEMPORARY SIDE EFFECT - GETTIND DATA FROM SPREADSHEET FOR FILLING
         log.debug(f"Adding spreadsheet info for company '{self.legal_name}' (USDOT: {self.usdot})...")
         try:
-            filled_fields_copy = filled_fields.copy()
-            spreadsheet = pd.read_csv(spreadsheet_path) 
-            append_sheet_to_fields_map(spreadsheet, filled_fields_copy, self.usdot)
-            filled_fields = filled_fields_copy
+            if not append_sheet_to_fields_map(contact_index, filled_fields, self.usdot):
+                log.debug(f"No spreadsheet info found for company '{self.legal_name}' (USDOT: {self.usdot}).")
         except Exception as e:
             log.warning(f"Error appending spreadsheet info for company '{self.legal_name}' (USDOT: {self.usdot}): {e}")
 
-        form.fill(filled_fields)
+        return filled_fields
+
+
+    def filled_form(self, mcs150_template, contact_index, fields: dict | None = None) -> "PdfWrapper":
+        """Fills the form with `fields`, if `form_fields` was already called for them, or with fresh ones."""
+        log.debug(f"Filling MCS-150 Form for company '{self.legal_name}' (USDOT: {self.usdot})'...")
+        form = mcs150_template.new_form()
+        form.fill(fields if fields is not None else self.form_fields(contact_index))
         return form
 
 
@@ -1,22 +1,33 @@
-import json5
 import os
+import sys
 
 
 MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Code shared with the other tools, like address parsing and the .jsonc loader, lives in the repository's `auto_common` package
+REPO_DIR = os.path.dirname(MODULE_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+from auto_common.config import load_jsonc, lazy
+
 
 class Config:
 #===User config defaults===
     SPREADSHEET_PATH = f"{MODULE_DIR}/data/companies.csv"
     OUTPUT_FORM_DIR = "/home/meow/work/MCS-150 forms"
-    
+    SNAPSHOT_CACHE_PATH = f"{MODULE_DIR}/data/safer_cache.sqlite3"
+    SNAPSHOT_TTL_DAYS = 30
+    NOT_FOUND_TTL_DAYS = 3
+    ADDRESS_CACHE_PATH = f"{MODULE_DIR}/data/address_cache.sqlite3"
+
 #===Machine config===
     MCS150_TEMPLATE_PATH = f"{MODULE_DIR}/MCS-150 Form.pdf"
 
     @staticmethod
     def load_json(filename):
-        with open(os.path.join(MODULE_DIR, filename), 'r') as f:
-            return json5.load(f)
-    
-    FIELDS_MAP_TEXT = load_json('fields_map_text.jsonc')
-    FIELDS_MAP_BOXES = load_json('fields_map_boxes.jsonc')
-    FIELDS_MAP_ADDRESSES = load_json('fields_map_addresses.jsonc')
+        return load_jsonc(os.path.join(MODULE_DIR, filename))
+
+    # Field maps are only read once forms get filled
+    FIELDS_MAP_TEXT = lazy(lambda: Config.load_json('fields_map_text.jsonc'))
+    FIELDS_MAP_BOXES = lazy(lambda: Config.load_json('fields_map_boxes.jsonc'))
+    FIELDS_MAP_ADDRESSES = lazy(lambda: Config.load_json('fields_map_addresses.jsonc'))
@@ -0,0 +1,194 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+import multiprocessing
+import random
+import time
+
+from log import log
+
+
+OPERATIONS = ["Interstate", "Intrastate Only (HM)", "Intrastate Only (Non-HM)"]
+CLASSIFICATIONS = ["Auth. For Hire", "Exempt For Hire", "Private(Property)", "Migrant", "U.S. Mail", "Local Gov't"]
+CARGO = ["General Freight", "Household Goods", "Metal: sheets, coils, rolls", "Motor Vehicles", "Building Materials",
+         "Fresh Produce", "Liquids/Gases", "Intermodal Cont.", "Refrigerated Food", "Beverages", "Construction"]
+STREETS = ["MAIN ST", "OAK AVE", "INDUSTRIAL PKWY", "COMMERCE DR", "HIGHWAY 30", "MARKET ST", "RIVER RD"]
+CITIES = [("SPRINGFIELD", "IL", "627"), ("DALLAS", "TX", "752"), ("FRESNO", "CA", "937"), ("ROCHESTER", "NY", "146"),
+          ("COLUMBUS", "OH", "432"), ("ATLANTA", "GA", "303"), ("PHOENIX", "AZ", "850"), ("TACOMA", "WA", "984")]
+NAME_WORDS = ["EAGLE", "SUMMIT", "BLUE", "LINE", "FREIGHT", "EXPRESS", "TRANSPORT", "HAULING", "LOGISTICS", "STAR",
+              "PRAIRIE", "COASTAL", "IRON", "ROAD", "CARRIERS", "NORTHERN"]
+
+NOT_FOUND_PAGE = "<html><body>Sorry, no records matching USDOT Number were found.</body></html>"
+
+
+def _address(rng: random.Random) -> str:
+    city, state, zip_prefix = rng.choice(CITIES)
+    return f"{rng.randint(1, 9999)} {rng.choice(STREETS)} <br/> {city}, {state} {zip_prefix}{rng.randint(0, 99):02d}"
+
+
+def _checkbox_table(summary: str, options: list[str], checked: set[str]) -> str:
+    rows = "".join(
+        f"<tr><td class='queryfield'>{'X' if option in checked else ''}</td><td><font>{option}</font></td></tr>"
+        for option in options
+    )
+    return f"<table summary='{summary}'><tr><th>{summary}</th></tr><tr><td><table>{rows}</table></td></tr></table>"
+
+
+def snapshot_page(usdot: int, out_of_service_rate: float = 0.05) -> str:
+    """
+    Renders a synthetic SAFER company snapshot page for the USDOT, laid out the way the `safer` parser
+    expects. The content is random but seeded by the USDOT, so the same USDOT always gets the same page.
+    """
+    rng = random.Random(usdot)
+
+    legal_name = " ".join(rng.sample(NAME_WORDS, rng.randint(2, 3))) + rng.choice([" LLC", " INC", " CO", ""])
+    dba_name = " ".join(rng.sample(NAME_WORDS, 2)) if rng.random() < 0.2 else ""
+    physical_address = _address(rng)
+    mailing_address = physical_address if rng.random() < 0.6 else _address(rng)
+    form_date = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2016, 2025)}"
+    out_of_service = (f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2019, 2025)}"
+                      if rng.random() < out_of_service_rate else "None")
+    mileage = f"{rng.randint(0, 2_000_000):,} ({rng.randint(2016, 2024)})"
+
+    def row(*cells):
+        return "<tr>" + "".join(f"<th>{th}</th><td>{td}</td>" for th, td in cells) + "</tr>"
+
+    general = "".join([
+        "<tr><td>USDOT INFORMATION</td></tr>",
+        "<tr><td>ID/Operations</td></tr>",
+        row(("Entity Type:", "CARRIER")),
+        row(("USDOT Status:", "ACTIVE"), ("Out of Service Date:", out_of_service)),
+        row(("USDOT Number:", usdot), ("State Carrier ID Number:", "")),
+        row(("MCS-150 Form Date:", form_date), ("MCS-150 Mileage (Year):", f"<font><b>{mileage}</b></font>")),
+        "<tr><td></td></tr>",
+        row(("Operating Authority Status:", "AUTHORIZED FOR Property")),
+        row(("MC/MX/FF Number(s):", f"<a>MC-{rng.randint(100000, 1999999)}</a>")),
+        "<tr><td></td></tr>",
+        row(("Legal Name:", legal_name)),
+        row(("DBA Name:", dba_name)),
+        row(("Physical Address:", physical_address)),
+        row(("Phone:", f"({rng.randint(201, 989)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}")),
+        row(("Mailing Address:", mailing_address)),
+        row(("DUNS Number:", "--")),
+        row(("Power Units:", rng.randint(1, 50)), ("Drivers:", f"<font><b>{rng.randint(1, 60)}</b></font>")),
+    ])
+
+    inspections = ("<table summary='Inspections'><tr><th>Inspections</th></tr>"
+                   + "<tr><td>3</td><td>2</td><td>0</td><td>0</td></tr>"
+                   + "<tr><td>0</td><td>0</td><td>0</td><td>0</td></tr>"
+                   + "<tr><td>0%</td><td>0%</td><td>0%</td><td>0%</td></tr>"
+                   + "<tr><td><font>21%</font></td><td><font>5%</font></td><td><font>4%</font></td><td><font>N/A</font></td></tr></table>")
+    crashes = "<table summary='Crashes'><tr><th>Crashes</th></tr><tr><td>0</td><td>0</td><td>1</td><td>1</td></tr></table>"
+
+    return "".join([
+        "<html><body>",
+        # Page header and navigation tables that precede the general information table
+        "<table><tr><td></td></tr></table>" * 6,
+        f"<table>{general}</table>",
+        _checkbox_table("Operation Classification", CLASSIFICATIONS, set(rng.sample(CLASSIFICATIONS, rng.randint(1, 2)))),
+        _checkbox_table("Carrier Operation", OPERATIONS, {rng.choice(OPERATIONS)}),
+        _checkbox_table("Cargo Carried", CARGO, set(rng.sample(CARGO, rng.randint(1, 4)))),
+        inspections, inspections, crashes, crashes,
+        "<b><font color='#0000C0'>10/01/2025</font></b>",
+        "</body></html>",
+    ])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep connections alive like SAFER does, so clients can reuse them
+    protocol_version = "HTTP/1.1"
+    fake = None
+
+    def do_POST(self):
+        body = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+        status, page = self.fake._respond(body.get("query_string", [""])[0])
+        payload = page.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeSafer:
+    """
+    Local stand-in for the SAFER query endpoint, serving `snapshot_page`s, for running auto_mcs150 offline.
+
+    The server runs in its own process, so that rendering pages doesn't compete with the client for the GIL.
+
+    Args:
+        latency (float): Seconds each request takes before it is answered.
+        error_rate (float): Share of requests answered with "503 Service Unavailable".
+        not_found_rate (float): Share of USDOTs that SAFER has no records for (decided by the USDOT).
+        out_of_service_rate (float): Share of companies with an out of service date.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, not_found_rate: float = 0.05, out_of_service_rate: float = 0.05, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.out_of_service_rate = out_of_service_rate
+        self.seed = seed
+
+        context = multiprocessing.get_context("spawn")
+        self._context = context
+        self._requests = context.Value("q", 0)
+        self._errors = context.Value("q", 0)
+        self._process = None
+        self._rng = None
+
+    @property
+    def requests(self) -> int:
+        return self._requests.value
+
+    @property
+    def errors(self) -> int:
+        return self._errors.value
+
+    def _respond(self, usdot: str) -> tuple[int, str]:
+        failed = self._rng.random() < self.error_rate
+        with self._requests.get_lock():
+            self._requests.value += 1
+        if failed:
+            with self._errors.get_lock():
+                self._errors.value += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return 503, ""
+        if not usdot.isdigit() or random.Random(f"found-{usdot}").random() < self.not_found_rate:
+            return 200, NOT_FOUND_PAGE
+        return 200, snapshot_page(int(usdot), self.out_of_service_rate)
+
+    def _serve(self, port_sender) -> None:
+        self._rng = random.Random(self.seed)
+        _Handler.fake = self
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        server.daemon_threads = True
+        port_sender.send(server.server_address[1])
+        server.serve_forever()
+
+    def start(self) -> str:
+        """Starts serving on a free local port in a background process. Returns the query endpoint URL."""
+        port_receiver, port_sender = self._context.Pipe(duplex=False)
+        self._process = self._context.Process(target=self._serve, args=(port_sender,), name="fake-safer", daemon=True)
+        self._process.start()
+
+        url = f"http://127.0.0.1:{port_receiver.recv()}/query.asp"
+        log.debug(f"Fake SAFER serving at '{url}' (latency: {self.latency}s, error rate: {self.error_rate}).")
+        return url
+
+    def stop(self) -> None:
+        if self._process:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __getstate__(self):
+        # Only the settings and shared counters go to the server process
+        state = self.__dict__.copy()
+        state["_process"] = None
+        state["_context"] = None
+        return state
@@ -1,48 +1,173 @@
 from safer import CompanySnapshot
+import safer.api
 from safer.exceptions import CompanySnapshotNotFoundException, SAFERUnreachableException
 from safer.results import Company
-from requests.exceptions import SSLError
+from requests.exceptions import ConnectionError, Timeout
 
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import time
 
+from snapshot import LiteClient, LiteSnapshot
+from throttle import RateLimiter, AdaptiveRateLimiter
 from log import log
 
+BACKENDS = ("safer", "lite")
 CLIENT = CompanySnapshot()
 
 
-def fetch_from_safer(usdot, max_retries = 0, time_before_retry = 0) -> Company | None:
+# Failures that mean SAFER is overloaded or down (connection resets, SSL errors, timeouts, 4xx/5xx statuses)
+# rather than anything wrong with the USDOT itself
+THROTTLING_ERRORS = (ConnectionError, Timeout, SAFERUnreachableException)
+
+
+def fetch_from_safer(usdot, max_retries = 0, time_before_retry = 0, cache = None, refresh = False, limiter = None, breaker = None) -> Company | LiteSnapshot | None:
     """
     Fetches company details based on a given USDOT number from SAFER and handles errors like
     company not found, too many requests
 
     Args:
     usdot: The USDOT number of the company to retrieve (required).
-    max_retries: The maximum number of retry attempts in case of an SSLError (required).
-    time_before_retry: The number of seconds to wait before retrying after an SSLError (required).
+    max_retries: The maximum number of retry attempts after a throttling-style error (required).
+    time_before_retry: The number of seconds to wait before retrying after a throttling-style error (required).
+    cache: Optional SnapshotCache consulted before and updated after the request.
+    refresh: Ignore cached entries and always fetch from SAFER (the result is still cached).
+    limiter: Optional RateLimiter waited on before each request actually sent to SAFER, and told how it went.
+    breaker: Optional CircuitBreaker that holds the request back while SAFER is down.
 
     Returns:
-        Optional[Company]: The company object if the fetch is successful and no errors occur, or `None` if 
+        Optional[Company | LiteSnapshot]: The company object (depending on the backend, see `use_backend`) if the fetch is successful and no errors occur, or `None` if 
                             an error occurs or the company does not meet the provided criteria.
 
     Error Handling:
         - If the USDOT number is not found, an error is logged and `None` is returned.
-        - If there is an SSLError due to too many requests to SAFER, the function will retry the request up to 
-          the maximum number of retries, waiting for the specified time before each retry.
+        - If SAFER resets the connection, times out or answers with an error status (see THROTTLING_ERRORS),
+          the limiter and breaker are told, and the request is retried up to the maximum number of retries,
+          waiting for the specified time before each retry.
     """
-    log.debug(f"Fetching data from SAFER by USDOT: {usdot}...")
+    if cache and not refresh:
+        hit, data = cache.get(usdot)
+        if hit:
+            log.debug(f"Using cached SAFER snapshot for USDOT: {usdot}.")
+            return snapshot_from_dict(data) if data is not None else None
 
-    try:
-        company = CLIENT.get_by_usdot_number(int(usdot))
-    except CompanySnapshotNotFoundException:
-        log.warning(f"Company with USDOT {usdot} not found.")
-        return
-    except SSLError or SAFERUnreachableException as e:
-        if max_retries > 0: # Base case
-            log.error(f"The SAFER website is currently unreachable. Waiting {time_before_retry} seconds before retry. Retries left: {max_retries}.")
+    retries_left = max_retries
+    while True:
+        if breaker:
+            breaker.wait()
+        if limiter:
+            limiter.wait()
+
+        log.debug(f"Fetching data from SAFER by USDOT: {usdot}...")
+
+        try:
+            company = CLIENT.get_by_usdot_number(int(usdot))
+            break
+        except CompanySnapshotNotFoundException:
+            log.warning(f"Company with USDOT {usdot} not found.")
+            company = None
+            break
+        except THROTTLING_ERRORS as e:
+            if limiter:
+                limiter.throttled()
+            if breaker:
+                breaker.failure()
+            if retries_left <= 0:
+                raise e
+            log.error(f"The SAFER website is currently unreachable ({e}). Waiting {time_before_retry} seconds before retry. Retries left: {retries_left}.")
+            retries_left -= 1
             time.sleep(time_before_retry)
-            return fetch_from_safer(usdot, max_retries-1, time_before_retry) # Retry recursively until max_retries hit 0 
-        else:
-            raise e
+
+    if limiter:
+        limiter.success()
+    if breaker:
+        breaker.success()
+
+    if cache:
+        cache.put(usdot, company.to_dict() if company else None)
 
     return company
 
+
+def use_backend(name: str, pool_size: int = 10) -> None:
+    """
+    Selects the SAFER client used for fetching:
+        - "safer": `safer.CompanySnapshot`, building full `Company` objects
+        - "lite": `LiteClient`, with a keep-alive connection pool of `pool_size` and only the fields we use
+    """
+    global CLIENT
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SAFER backend '{name}', expected one of: {', '.join(BACKENDS)}.")
+    CLIENT = LiteClient(pool_size) if name == "lite" else CompanySnapshot()
+
+
+def snapshot_from_dict(data: dict) -> Company | LiteSnapshot:
+    """Builds the current backend's company object from a raw snapshot dictionary."""
+    if isinstance(CLIENT, LiteClient):
+        return LiteSnapshot.from_dict(data)
+    return Company(data=data)
+
+
+def set_safer_url(url: str) -> None:
+    """
+    Points the SAFER client at a different query endpoint, e.g. a local fake SAFER server for testing.
+    """
+    log.debug(f"Using SAFER query endpoint at: '{url}'.")
+    safer.api.SAFER_QUERY_URL = url
+    safer.api.sess.headers.pop("Host", None)
+
+
+def fetch_many(usdots, max_retries = 0, time_before_retry = 0, workers = 1, rate_limit = None, cache = None, refresh = False, max_rate_limit = None, breaker = None):
+    """
+    Fetches companies for an iterable of USDOT numbers, keeping up to `workers` requests in flight
+    while starting no more than `rate_limit` requests per second overall.
+
+    Args:
+    usdots: Iterable of USDOT numbers to fetch.
+    max_retries: Passed through to `fetch_from_safer` for every USDOT.
+    time_before_retry: Passed through to `fetch_from_safer` for every USDOT.
+    workers: Number of concurrent fetching threads.
+    rate_limit: Global cap on requests started per second, or None for no cap. Cache hits don't count against it.
+                With `max_rate_limit` above it, this is only the starting rate: it then adapts to how SAFER
+                responds, between a tenth of a request per second and `max_rate_limit`.
+    cache: Optional SnapshotCache shared by all workers.
+    refresh: Ignore cached entries and re-fetch every USDOT.
+    max_rate_limit: Ceiling for the adaptive rate, or None to keep `rate_limit` fixed.
+    breaker: Optional CircuitBreaker shared by all workers.
+
+    Yields:
+        tuple[usdot, Optional[Company | LiteSnapshot], Optional[Exception]]: One result per USDOT, in input order.
+        A failed fetch yields `None` as the company and the exception that caused it.
+    """
+    limiter = None
+    if rate_limit and max_rate_limit and max_rate_limit > rate_limit:
+        limiter = AdaptiveRateLimiter(rate_limit, max_rate_limit)
+    elif rate_limit:
+        limiter = RateLimiter(rate_limit)
+    workers = max(1, workers)
+
+    def task(usdot):
+        return fetch_from_safer(usdot, max_retries, time_before_retry, cache, refresh, limiter, breaker)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="safer")
+    pending = deque()
+
+    def result(usdot, future):
+        try:
+            return usdot, future.result(), None
+        except Exception as e:
+            return usdot, None, e
+
+    try:
+        for usdot in usdots:
+            pending.append((usdot, executor.submit(task, usdot)))
+            # Bound the read-ahead so memory doesn't grow with the input size
+            if len(pending) >= workers * 2:
+                yield result(*pending.popleft())
+
+        while pending:
+            yield result(*pending.popleft())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if isinstance(limiter, AdaptiveRateLimiter):
+            log.info(f"SAFER request rate settled at {limiter.rate:.2f}/s.")
@@ -1,10 +1,45 @@
 
+import pandas as pd
+
+from collections import Counter
 from datetime import datetime
+from itertools import batched
 
 from utils import parse_datetime
 from company import SimpleCompany
 from log import log
 
+OUT_OF_SERVICE = "Company is out of service"
+MISSING_FORM_DATE = "Missing MCS-150 last update date"
+UPDATED_AFTER = "MCS-150 update is after {before}"
+# Raw MCS-150 form date format in SAFER snapshots
+SAFER_DATE_FORMAT = "%m/%d/%Y"
+
+# Companies removed by the filters this run, by reason
+FILTER_STATS = Counter()
+
+
+def filter_reasons(
+    company,
+    exclude_out_of_service: bool = True,
+    before: datetime | None = None
+) -> list[str]:
+    """
+    Returns the reasons a Company object doesn't pass the filters, or an empty list if it does.
+    """
+    reasons = []
+
+    if exclude_out_of_service and company.out_of_service_date:
+        reasons.append(OUT_OF_SERVICE)
+
+    if before:
+        if not company.mcs_150_form_date:
+            reasons.append(MISSING_FORM_DATE)
+        elif company.mcs_150_form_date >= before:
+            reasons.append(UPDATED_AFTER.format(before=before))
+
+    return reasons
+
 
 def filter_company(
     company, 
@@ -21,19 +56,10 @@ def filter_company(
     if not company:
         return
     
-    reasons = []
-
-    if exclude_out_of_service and company.out_of_service_date:
-        reasons.append("Company is out of service")
-
-    if before:
-        if isinstance(before, str):
-            before = parse_datetime(before)
+    if isinstance(before, str):
+        before = parse_datetime(before)
 
-        if not company.mcs_150_form_date:
-            reasons.append("Missing MCS-150 last update date")
-        elif company.mcs_150_form_date >= before:
-            reasons.append(f"MCS-150 update is after {before}")
+    reasons = filter_reasons(company, exclude_out_of_service, before)
 
     if reasons:
         log.debug(
@@ -50,16 +76,83 @@ def filter_company(
     return company
 
 
-def filtered_companies(companies, exclude_out_of_service = True, before = None):
-    filtered_companies = []
-    
-    for comp in companies:
-        try:
-            if not filter_company(comp, exclude_out_of_service, before):
-                continue
-            filtered_companies.append(SimpleCompany.from_company(comp))
-        except Exception as e:
-            log.error(f"Error when filtering company '{comp.legal_name or "Unknown"}': {e}")
+def filter_masks(
+    companies: list,
+    exclude_out_of_service: bool = True,
+    before: datetime | None = None
+) -> pd.DataFrame:
+    """
+    Applies the same filters as `filter_reasons` to a batch of Company objects at once.
+
+    Returns:
+        pd.DataFrame: One row per company and one boolean column per filter reason, True where the company fails it.
+    """
+    frame = pd.DataFrame({
+        "out_of_service_date": pd.to_datetime([comp.out_of_service_date for comp in companies]),
+        "mcs_150_form_date": pd.to_datetime([comp.mcs_150_form_date for comp in companies]),
+    })
+
+    masks = pd.DataFrame(index=frame.index)
+    masks[OUT_OF_SERVICE] = frame["out_of_service_date"].notna() & exclude_out_of_service
+    if before:
+        masks[MISSING_FORM_DATE] = frame["mcs_150_form_date"].isna()
+        masks[UPDATED_AFTER.format(before=before)] = frame["mcs_150_form_date"] >= pd.Timestamp(before)
+
+    return masks
+
+
+def iter_filtered_companies(companies, exclude_out_of_service = True, before = None, journal = None, batch_size = 64):
+    """
+    Streams SimpleCompany objects for the companies that pass the filters, in input order.
+
+    Companies are filtered in batches of up to `batch_size` with `filter_masks`. Removed companies are
+    counted in FILTER_STATS and recorded in the journal with their reasons.
+    """
+    if isinstance(before, str):
+        before = parse_datetime(before)
+
+    for batch in batched(companies, batch_size):
+        batch = [comp for comp in batch if comp]
+        if not batch:
             continue
-        
-    return filtered_companies
\ No newline at end of file
+
+        masks = filter_masks(batch, exclude_out_of_service, before)
+        failed = masks.any(axis=1)
+        FILTER_STATS.update({reason: int(count) for reason, count in masks.sum().items() if count})
+        log.debug(f"{int(failed.sum())} of {len(batch)} companies in batch filtered out.")
+
+        for comp, row, is_failed in zip(batch, masks.itertuples(index=False), failed):
+            if is_failed:
+                if journal:
+                    journal.record(comp.usdot, "filtered", reason=", ".join(masks.columns[list(row)]))
+                continue
+            try:
+                yield SimpleCompany.from_company(comp)
+            except Exception as e:
+                log.error(f"Error when filtering company '{comp.legal_name or "Unknown"}': {e}")
+                continue
+
+
+def filtered_companies(companies, exclude_out_of_service = True, before = None, journal = None):
+    return list(iter_filtered_companies(companies, exclude_out_of_service, before, journal))
+
+
+def updated_after_in_cache(usdots: list, cache, before: datetime) -> list:
+    """
+    Returns the USDOTs among `usdots` whose cached snapshot, fresh or expired, already shows an MCS-150
+    update on or after `before`. Form dates only move forward, so fetching these again can't make them
+    pass the filter.
+    """
+    dates = cache.stored_form_dates(usdots)
+    if not dates:
+        return []
+    dates = pd.to_datetime(pd.Series(dates), format=SAFER_DATE_FORMAT, errors="coerce")
+    return dates.index[dates >= pd.Timestamp(before)].tolist()
+
+
+def log_filter_summary() -> None:
+    """Logs a one-time summary of the counts in FILTER_STATS."""
+    if not FILTER_STATS:
+        return
+    summary = ", ".join(f"{reason} ({count})" for reason, count in FILTER_STATS.most_common())
+    log.info(f"Companies filtered out by reason: {summary}")
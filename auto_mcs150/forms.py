@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import multiprocessing
+import os
+import time
+
+from template import FormTemplate
+from log import log
+
+
+class FormPaths:
+    """
+    Assigns each company its output path, `{legal_name}.pdf`, disambiguating companies that share a legal name
+    with their USDOT: `{legal_name} (USDOT {usdot}).pdf`. The first company to claim a name keeps it, so the
+    result is deterministic for a given input order. Paths recorded by a resumed run's journal stay claimed
+    by the USDOTs that wrote them.
+    """
+
+    def __init__(self, output_dir: str, journal = None):
+        self.output_dir = output_dir
+        self._claims: dict[str, str] = {}
+
+        if journal:
+            for usdot, entry in journal.stages.items():
+                if entry["stage"] == "written":
+                    self._claims[os.path.basename(entry["path"])] = usdot
+
+    def path_for(self, company) -> str:
+        usdot = str(company.usdot)
+        filename = f"{company.legal_name}.pdf"
+        if self._claims.setdefault(filename, usdot) != usdot:
+            filename = f"{company.legal_name} (USDOT {usdot}).pdf"
+            self._claims[filename] = usdot
+            log.debug(f"Another company is already named '{company.legal_name}', saving USDOT {usdot} as '{filename}'.")
+
+        return os.path.join(self.output_dir, filename)
+
+
+# Per-process state of the form filling workers, set up once by `_init_worker`
+_template = None
+_contact_index = None
+
+
+def _init_worker(template_path: str, contact_index: dict) -> None:
+    global _template, _contact_index
+    _template = FormTemplate(template_path)
+    _contact_index = contact_index
+
+
+def _fill_and_write(company, path: str, fields = None, template = None, contact_index = None, to_bytes = False) -> tuple[bytes | None, str | None, float]:
+    """
+    Fills one company's form and writes it to `path`, or returns its bytes instead if `to_bytes` is set.
+    The form is filled with `fields` if given, otherwise with the company's fields from `contact_index`.
+
+    Returns:
+        tuple[Optional[bytes], Optional[str], float]: The form bytes (with `to_bytes`), the error message if it
+        failed and the seconds it took, timed here so a worker's time isn't mixed up with waiting for the pool.
+    """
+    start = time.perf_counter()
+    try:
+        form = company.filled_form(template or _template, contact_index if contact_index is not None else _contact_index, fields)
+        if to_bytes:
+            return form.read(), None, time.perf_counter() - start
+        form.write(path)
+        return None, None, time.perf_counter() - start
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+
+
+def write_forms(jobs, template: FormTemplate, contact_index: dict, workers: int = 1, archive = None, timings = None):
+    """
+    Fills and writes MCS-150 forms for an iterable of `(SimpleCompany, output_path, form_fields)` jobs.
+    `form_fields` are the company's fields if the caller already has them from `SimpleCompany.form_fields`,
+    or None to have them mapped where the form is filled.
+
+    With more than one worker, the jobs are spread across a process pool. Each worker parses the template
+    and receives the contact index once, at startup, so only the job itself is sent per form.
+
+    With a FormArchive, output paths point into the archive: the workers send the filled forms back, and
+    they are added to the archive here, by the only process writing to it.
+
+    With a `timings` list, the seconds each form took to fill and write are appended to it as its result is
+    yielded. Forms are timed where they're filled, so with a process pool these are per-form latencies.
+
+    Yields:
+        tuple[SimpleCompany, str, Optional[str]]: The company, its output path and the error message if filling
+        or writing failed, in the order the jobs came in.
+    """
+    to_bytes = archive is not None
+
+    def written(company, path, data, error, seconds):
+        if timings is not None:
+            timings.append(seconds)
+        if to_bytes and not error:
+            try:
+                archive.add(path, data, company.usdot, company.legal_name)
+            except Exception as e:
+                error = str(e)
+        return company, path, error
+
+    if workers <= 1:
+        for company, path, fields in jobs:
+            yield written(company, path, *_fill_and_write(company, path, fields, template, contact_index, to_bytes))
+        return
+
+    # Spawn rather than fork: the fetch and pipeline threads are already running by the time the pool starts
+    executor = ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker,
+                                   initargs=(template.path, contact_index))
+    pending = deque()
+
+    try:
+        for company, path, fields in jobs:
+            pending.append((company, path, executor.submit(_fill_and_write, company, path, fields, to_bytes=to_bytes)))
+            # Bound the jobs in flight so memory doesn't grow with the input size
+            if len(pending) >= workers * 2:
+                company, path, future = pending.popleft()
+                yield written(company, path, *future.result())
+
+        while pending:
+            company, path, future = pending.popleft()
+            yield written(company, path, *future.result())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import time
+
+from log import log
+
+
+class RunJournal:
+    """
+    Append-only JSON-lines record of how far each USDOT got through the pipeline:
+
+        - "fetched": snapshot loaded from SAFER (or the cache)
+        - "not_found": SAFER has no company with that USDOT
+        - "filtered": company was filtered out, with the `reason`
+        - "written": filled form was saved, with its output `path`
+
+    A resumed run skips every USDOT whose last recorded stage is final, unless the form it
+    recorded as written has since been removed. `exists` decides whether a written form is still there.
+    """
+    FILENAME = ".auto_mcs150_journal.jsonl"
+    FINAL_STAGES = ("not_found", "filtered", "written")
+
+    def __init__(self, path: str, resume: bool = False, exists = os.path.exists):
+        self.path = path
+        self.exists = exists
+        # Last recorded stage per USDOT from the run being resumed; new records only go to disk
+        self.stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self._load()
+            log.info(f"Resuming run from journal at '{path}': {len(self.done_usdots())} companies already completed.")
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a" if resume else "w")
+
+    def _load(self) -> None:
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line may be cut short by a crash mid-write
+                    log.warning(f"Skipping malformed journal entry: {line.strip()!r}")
+                    continue
+                self.stages[entry["usdot"]] = entry
+
+    def record(self, usdot, stage: str, **details) -> None:
+        """Appends a stage completion for the USDOT and flushes it to disk right away."""
+        entry = {"usdot": str(usdot), "stage": stage, "time": time.time(), **details}
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def _is_final(self, entry: dict) -> bool:
+        if entry["stage"] == "written":
+            return self.exists(entry.get("path", ""))
+        return entry["stage"] in self.FINAL_STAGES
+
+    def is_done(self, usdot) -> bool:
+        entry = self.stages.get(str(usdot))
+        return entry is not None and self._is_final(entry)
+
+    def done_usdots(self) -> set[str]:
+        return {usdot for usdot, entry in self.stages.items() if self._is_final(entry)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
@@ -1,35 +1,110 @@
 import pandas as pd
 
-from fetch import fetch_from_safer
+from itertools import batched
+
+from fetch import fetch_many
+from filtering import FILTER_STATS, UPDATED_AFTER, updated_after_in_cache
+from utils import parse_datetime
 from log import log
 
 
-def load_companies_from_csv(path_to_csv: str, max_retries = 0, time_before_retry = 0, usdot_column = 'usdot'):
+def read_usdots(path_to_csv: str, usdot_column = 'usdot', chunksize = 10_000):
     """
-    Creates a list of Company objects from a CSV by the USDOT numbers.
+    Lazily reads the USDOT column of a CSV in chunks, so the whole file is never held in memory.
+
+    Yields:
+        USDOT numbers in file order.
+    """
+    header = pd.read_csv(path_to_csv, nrows=0)
+    if usdot_column not in header.columns:
+        raise ValueError("CSV doesn't contain the usdot column specified.")
+
+    for chunk in pd.read_csv(path_to_csv, usecols=[usdot_column], chunksize=chunksize):
+        yield from chunk[usdot_column]
+
+
+def iter_companies_from_csv(path_to_csv: str, max_retries = 0, time_before_retry = 0, usdot_column = 'usdot', workers = 1, rate_limit = None, cache = None, refresh = False, journal = None, max_rate_limit = None, breaker = None, before = None):
+    """
+    Streams Company objects fetched from SAFER by the USDOT numbers in a CSV.
 
     Args:
     path_to_csv (str): Path to the CSV file.
-    
-    Returns:
-    List[Company]: A list of Company objects, each created with data from SAFER based on USDOT numbers.
+    workers (int): Number of SAFER requests kept in flight at once.
+    rate_limit (float): Maximum number of SAFER requests started per second, or None for no cap.
+    cache (SnapshotCache): Optional on-disk snapshot cache, consulted before going to SAFER.
+    refresh (bool): Ignore cached snapshots and re-fetch everything.
+    journal (RunJournal): Optional run journal; USDOTs it marks as done are skipped, and fetches are recorded.
+    max_rate_limit (float): Ceiling the request rate may adapt up to, or None to keep `rate_limit` fixed.
+    breaker (CircuitBreaker): Optional circuit breaker pausing all requests while SAFER is down.
+    before (str | datetime): MCS-150 update cutoff of the filter. USDOTs whose cached snapshot, however old,
+                             already shows an update on or after it are filtered out without being fetched,
+                             unless `refresh` is set.
+
+    Yields:
+    Optional[Company]: Company objects in the same order as the CSV, or `None` for USDOTs not found on SAFER.
+                       USDOTs that failed to fetch are logged and left out.
     """
-    df = pd.read_csv(path_to_csv)
-    
-    if usdot_column not in df.columns:
-        raise ValueError("CSV doesn't contain the usdot column specified.")
-    
-    companies = []
+    usdots = read_usdots(path_to_csv, usdot_column)
+
+    skipped = 0
+    def not_done(usdots):
+        nonlocal skipped
+        for usdot in usdots:
+            if journal.is_done(usdot):
+                skipped += 1
+                continue
+            yield usdot
+
+    if journal:
+        usdots = not_done(usdots)
 
-    for _, row in df.iterrows():
-        usdot = row[usdot_column]
-        try:
-            company = fetch_from_safer(usdot, max_retries, time_before_retry)
-            companies.append(company)
+    if isinstance(before, str):
+        before = parse_datetime(before)
+    reason = f"{UPDATED_AFTER.format(before=before)} (cached, not fetched)"
 
-        except Exception as e:
-            log.error(f"Company with USDOT {usdot}: {e}. Stopping the fetching of company data and returning the data already collected.")
-            break
-    
-    return companies
+    def not_filtered_by_cache(usdots):
+        for chunk in batched(usdots, 500):
+            decided = set(updated_after_in_cache(chunk, cache, before))
+            FILTER_STATS.update({reason: len(decided)} if decided else {})
+            for usdot in chunk:
+                if str(usdot) in decided:
+                    if journal:
+                        journal.record(usdot, "filtered", reason=reason)
+                    continue
+                yield usdot
 
+    # A refresh ignores cached snapshots, so it doesn't filter by them either
+    if cache and before and not refresh:
+        usdots = not_filtered_by_cache(usdots)
+
+    fetched = 0
+    failed = 0
+
+    for usdot, company, error in fetch_many(usdots, max_retries, time_before_retry, workers, rate_limit, cache, refresh, max_rate_limit, breaker):
+        if error:
+            log.error(f"Company with USDOT {usdot}: {error}")
+            failed += 1
+            continue
+        if journal:
+            journal.record(usdot, "fetched" if company else "not_found")
+        fetched += 1
+        yield company
+
+    if skipped:
+        log.info(f"Skipped {skipped} companies already completed in a previous run.")
+    if failed:
+        log.warning(f"Failed to fetch {failed} of {fetched + failed} companies from SAFER.")
+
+
+def load_companies_from_csv(path_to_csv: str, max_retries = 0, time_before_retry = 0, usdot_column = 'usdot', workers = 1, rate_limit = None, cache = None, refresh = False, journal = None, max_rate_limit = None, breaker = None, before = None):
+    """
+    Creates a list of Company objects from a CSV by the USDOT numbers.
+
+    Args:
+    path_to_csv (str): Path to the CSV file.
+
+    Returns:
+    List[Company]: A list of Company objects, each created with data from SAFER based on USDOT numbers.
+                   See `iter_companies_from_csv` for the other arguments.
+    """
+    return list(iter_companies_from_csv(path_to_csv, max_retries, time_before_retry, usdot_column, workers, rate_limit, cache, refresh, journal, max_rate_limit, breaker, before))
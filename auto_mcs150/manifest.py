@@ -0,0 +1,101 @@
+from collections import Counter
+import hashlib
+import json
+import os
+
+from log import log
+
+
+def form_digest(fields: dict, template_digest: str = "") -> str:
+    """
+    Content hash of a filled form: its field values and the template they're filled into, so a new template
+    changes every form's hash.
+    """
+    payload = json.dumps([template_digest, sorted(fields.items())], default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FormManifest:
+    """
+    Content hashes of the forms written to an output location, kept as JSON lines next to them, so later runs
+    can tell which companies' forms would come out the same.
+
+    Compared with the previous runs' entries, each form this run is one of:
+        - "added": no form was recorded for the USDOT, or the recorded one is gone
+        - "changed": the form's fields, the template or its path differ from the recorded one
+        - "unchanged": the same form is already there
+    Forms recorded earlier that this run didn't produce, and that are still there, are "orphaned".
+
+    Entries are appended as forms are written, so the manifest survives interrupted runs, and compacted on close.
+    """
+    FILENAME = ".auto_mcs150_manifest.jsonl"
+
+    def __init__(self, path: str, exists = os.path.exists):
+        self.path = path
+        self.exists = exists
+        # Last recorded form per USDOT from earlier runs, and the ones recorded by this run
+        self.previous: dict[str, dict] = {}
+        self.current: dict[str, dict] = {}
+        self.counts = Counter()
+
+        if os.path.exists(path):
+            self._load()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a")
+
+    def _load(self) -> None:
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line may be cut short by a crash mid-write
+                    log.warning(f"Skipping malformed manifest entry: {line.strip()!r}")
+                    continue
+                self.previous[entry["usdot"]] = entry
+
+    def status(self, usdot, path: str, digest: str) -> str:
+        """Compares a form about to be written with the one recorded for the USDOT: "added", "changed" or "unchanged"."""
+        entry = self.previous.get(str(usdot))
+        if entry is None or not self.exists(entry["path"]):
+            return "added"
+        if entry["path"] == path and entry["hash"] == digest:
+            return "unchanged"
+        return "changed"
+
+    def record(self, usdot, path: str, digest: str, status: str) -> None:
+        """Records the form now at `path` for the USDOT, counting it under its `status`."""
+        entry = {"usdot": str(usdot), "path": path, "hash": digest}
+        self.current[entry["usdot"]] = entry
+        self.counts[status] += 1
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def orphaned(self) -> list[str]:
+        """Paths of forms recorded by earlier runs that this run didn't produce, and that are still there."""
+        produced = {entry["path"] for entry in self.current.values()}
+        return [
+            entry["path"] for usdot, entry in self.previous.items()
+            if usdot not in self.current and entry["path"] not in produced and self.exists(entry["path"])
+        ]
+
+    def log_summary(self) -> None:
+        orphaned = self.orphaned()
+        for path in orphaned:
+            log.debug(f"Orphaned form from an earlier run: '{path}'.")
+        log.info(f"Forms added: {self.counts['added']}, changed: {self.counts['changed']}, "
+                 + f"unchanged: {self.counts['unchanged']}, orphaned: {len(orphaned)}.")
+
+    def close(self) -> None:
+        """Rewrites the manifest with one entry per USDOT, keeping earlier entries whose forms are still there."""
+        self._file.close()
+
+        entries = {usdot: entry for usdot, entry in self.previous.items() if self.exists(entry["path"])}
+        entries.update(self.current)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,61 @@
+import queue
+import threading
+
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception raised by a producer over to the consuming thread."""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def buffered(iterable, maxsize: int = 64, name: str = "stage"):
+    """
+    Drives `iterable` on a background thread and yields its items through a bounded queue,
+    so the producing stage works ahead of the consumer by at most `maxsize` items.
+
+    Exceptions raised by the producer are re-raised in the consumer. If the consumer stops
+    early, the producer is stopped and closed at its next item.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+            return
+        finally:
+            # Let generator stages clean up (e.g. shut down their thread pools)
+            close = getattr(iterable, "close", None)
+            if close:
+                close()
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
@@ -2,58 +2,117 @@ import pandas as pd
 
 from log import log
 
-def append_sheet_to_fields_map(
-    spreadsheet: pd.DataFrame,
-    fields_map: dict[str, str],
-    usdot: str,
+# Conflicting USDOTs named in the warning; the full list goes to the debug log
+MAX_LOGGED_CONFLICTS = 10
+
+
+def normalize_usdot(usdot) -> str:
+    return str(usdot).strip().lower()
+
+
+def contact_fields(contact_str: str, email: str) -> dict[str, str]:
+    """Maps a comma-separated contact names cell and an email cell to MCS-150 form fields."""
+    contacts = [name.strip() for name in contact_str.split(",") if name.strip()]
+
+    return {
+        "20eMail": email,
+        "officerName1": contacts[0] if len(contacts) > 0 else "",
+        "officerName2": contacts[1] if len(contacts) > 1 else "",
+        "certifyName": contacts[0] if len(contacts) > 0 else "",
+    }
+
+
+def load_contact_index(
+    spreadsheet_path: str,
     contact_columns: tuple[str, ...] = ("Contact Name",),
     usdot_columns: tuple[str, ...] = ("DOT#", "usdot"),
     email_columns: tuple[str, ...] = ("email", "Email")
-) -> bool:
+) -> dict[str, dict[str, str]]:
     """
-    Updates fields_map with contact info from spreadsheet based on the USDOT number.
+    Reads the contact spreadsheet once and indexes its contact form fields by normalized USDOT number.
+
+    Every column in `usdot_columns` present in the spreadsheet is indexed. When a USDOT appears in more
+    than one row, the first row wins (as the old row-by-row scan did), and the duplicates are reported
+    once, with those whose contact info differs called out as conflicts.
 
     Args:
-        spreadsheet: The input DataFrame containing company data.
-        fields_map: The dictionary to update with extracted fields.
-        usdot: The USDOT number to match in the spreadsheet.
+        spreadsheet_path: Path to the spreadsheet CSV.
         contact_columns: Column names to look for contact names.
         usdot_columns: Column names to search for the USDOT number.
         email_columns: Column names to look for email addresses.
 
     Returns:
-        True if a match was found and fields_map was updated, False otherwise.
+        A dictionary of normalized USDOT -> form fields to update the fields map with.
     """
+    spreadsheet = pd.read_csv(spreadsheet_path, dtype=str, keep_default_na=False)
+
     present_contact_columns = [col for col in contact_columns if col in spreadsheet.columns]
     present_usdot_columns = [col for col in usdot_columns if col in spreadsheet.columns]
     present_email_columns = [col for col in email_columns if col in spreadsheet.columns]
 
     if not present_usdot_columns:
         log.error("No usable USDOT columns found in spreadsheet.")
-        return False
+        return {}
     if not present_email_columns:
         log.error("No usable email columns found in spreadsheet.")
     if not present_contact_columns:
         log.error("No usable contact name columns found in spreadsheet.")
 
-    usdot_norm = usdot.strip().lower()
+    empty = pd.Series("", index=spreadsheet.index)
+    contact_strs = spreadsheet[present_contact_columns[0]].str.strip() if present_contact_columns else empty
+    emails = spreadsheet[present_email_columns[0]].str.strip() if present_email_columns else empty
+    rows_fields = [contact_fields(c, e) for c, e in zip(contact_strs, emails)]
 
-    for _, row in spreadsheet.iterrows():
-        row_usdots = [str(row[col]).strip().lower() for col in present_usdot_columns]
-        if usdot_norm not in row_usdots:
-            continue
+    index: dict[str, dict[str, str]] = {}
+    index_rows: dict[str, int] = {}
+    duplicates, conflicts = set(), set()
 
-        contact_str = str(row[present_contact_columns[0]]).strip() if present_contact_columns else ""
-        contacts = [name.strip() for name in contact_str.split(",") if name.strip()]
-        email = str(row[present_email_columns[0]]).strip() if present_email_columns else ""
+    for col in present_usdot_columns:
+        for row, usdot in enumerate(spreadsheet[col].map(normalize_usdot)):
+            if not usdot:
+                continue
+            if usdot not in index:
+                index[usdot] = rows_fields[row]
+                index_rows[usdot] = row
+                continue
+            if index_rows[usdot] == row:
+                continue  # Same row listing the USDOT under more than one column
+            duplicates.add(usdot)
+            if index[usdot] != rows_fields[row]:
+                conflicts.add(usdot)
 
-        fields_map.update({
-            "20eMail": email,
-            "officerName1": contacts[0] if len(contacts) > 0 else "",
-            "officerName2": contacts[1] if len(contacts) > 1 else "",
-            "certifyName": contacts[0] if len(contacts) > 0 else "",
-        })
-        return True
+    log.debug(f"Indexed {len(index)} USDOTs from spreadsheet at '{spreadsheet_path}'.")
+    if duplicates:
+        log.warning(f"{len(duplicates)} USDOTs appear in more than one spreadsheet row; using the first row for each.")
+    if conflicts:
+        conflicts = sorted(conflicts)
+        shown = ", ".join(conflicts[:MAX_LOGGED_CONFLICTS])
+        more = f" and {len(conflicts) - MAX_LOGGED_CONFLICTS} more" if len(conflicts) > MAX_LOGGED_CONFLICTS else ""
+        log.warning(f"{len(conflicts)} of them have conflicting contact info: {shown}{more}")
+        log.debug(f"USDOTs with conflicting contact info: {', '.join(conflicts)}")
 
-    return False  # No match found
+    return index
+
+
+def append_sheet_to_fields_map(
+    contact_index: dict[str, dict[str, str]],
+    fields_map: dict[str, str],
+    usdot: str
+) -> bool:
+    """
+    Updates fields_map with contact info from the spreadsheet index based on the USDOT number.
+
+    Args:
+        contact_index: The index built by `load_contact_index`.
+        fields_map: The dictionary to update with extracted fields.
+        usdot: The USDOT number to look up.
+
+    Returns:
+        True if a match was found and fields_map was updated, False otherwise.
+    """
+    fields = contact_index.get(normalize_usdot(usdot))
+    if fields is None:
+        return False  # No match found
 
+    fields_map.update(fields)
+    return True
@@ -0,0 +1,201 @@
+from safer.crawler import parse_html_to_tree
+from safer.exceptions import CompanySnapshotNotFoundException, SAFERUnreachableException
+from safer.html import process_extracted_text
+import safer.api
+from dateutil import parser as date_parser
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from log import log
+
+
+# Keys of the raw snapshot dictionaries produced by the `safer` library. Snapshots are cached in this shape,
+# so both backends can read each other's cache entries.
+SAFER_KEYS = (
+    "entity_type", "operating_authority_status", "legal_name", "dba_name", "duns_number", "state_carrier_id",
+    "mailing_address", "physical_address", "carrier_operation", "hm_shipper_operation", "mcs_150_mileage_year",
+    "mc_mx_ff_numbers", "operation_classification", "power_units", "drivers", "usdot", "phone", "safety_rating",
+    "safety_type", "united_states_inspections", "united_states_crashes", "canada_inspections", "canada_crashes",
+    "cargo_carried", "latest_update", "safety_review_date", "mcs_150_form_date", "out_of_service_date",
+)
+
+# XPaths into the general information table, the same ones `safer` uses, for the fields we need only
+TEXT_FIELDS = {
+    "legal_name": "tr[11]/td/text()",
+    "dba_name": "tr[12]/td/text()",
+    "physical_address": "tr[13]/td/text()",
+    "phone": "tr[14]/td/text()",
+    "mailing_address": "tr[15]/td/text()",
+    "usdot": "tr[5]/td[1]/text()",
+    "mc_mx_ff_numbers": "tr[9]/td[1]/a/text()",
+    "mcs_150_form_date": "tr[6]/td[1]/text()",
+    "mcs_150_mileage_year": "tr[6]/td[2]/font/b/text()",
+    "out_of_service_date": "tr[4]/td[2]/text()",
+}
+CHECKBOX_TABLES = {
+    "operation_classification": "Operation Classification",
+    "carrier_operation": "Carrier Operation",
+    "cargo_carried": "Cargo Carried",
+}
+CHECKED_XPATH = "tr[2]/td/table/tr[.//td[@class='queryfield']/text() = 'X']/td/font/text()"
+
+SAFER_DATE_FORMAT = "%m/%d/%Y"
+
+
+def parse_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, SAFER_DATE_FORMAT)
+    except ValueError:
+        return date_parser.parse(value)
+
+
+@dataclass(slots=True)
+class LiteSnapshot:
+    """
+    Company snapshot holding only the fields that filtering and `SimpleCompany.from_company` read, under the
+    same names and with the same values as `safer.results.Company`.
+    """
+    usdot: str | None = None
+    legal_name: str | None = None
+    dba_name: str | None = None
+    physical_address: str | None = None
+    mailing_address: str | None = None
+    phone_number: str | None = None
+    mc_mx_ff_numbers: str | None = None
+    mcs_150_form_date_raw: str | None = None
+    mcs_150_mileage_year: dict | None = None
+    out_of_service_date_raw: str | None = None
+    operation_classification: list | None = None
+    carrier_operation: list | None = None
+    cargo_carried: list | None = None
+
+    @property
+    def mcs_150_form_date(self) -> datetime | None:
+        return parse_date(self.mcs_150_form_date_raw)
+
+    @property
+    def out_of_service_date(self) -> datetime | None:
+        return parse_date(self.out_of_service_date_raw)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LiteSnapshot":
+        """Builds a snapshot from a raw snapshot dictionary, as cached by either backend."""
+        return cls(
+            usdot=data.get("usdot"),
+            legal_name=data.get("legal_name"),
+            dba_name=data.get("dba_name"),
+            physical_address=data.get("physical_address"),
+            mailing_address=data.get("mailing_address"),
+            phone_number=data.get("phone"),
+            mc_mx_ff_numbers=data.get("mc_mx_ff_numbers"),
+            mcs_150_form_date_raw=data.get("mcs_150_form_date"),
+            mcs_150_mileage_year=data.get("mcs_150_mileage_year"),
+            out_of_service_date_raw=data.get("out_of_service_date"),
+            operation_classification=data.get("operation_classification"),
+            carrier_operation=data.get("carrier_operation"),
+            cargo_carried=data.get("cargo_carried"),
+        )
+
+    def to_dict(self) -> dict:
+        """Returns the snapshot as a raw snapshot dictionary, with the fields it doesn't keep set to None."""
+        data = dict.fromkeys(SAFER_KEYS)
+        data.update(
+            usdot=self.usdot,
+            legal_name=self.legal_name,
+            dba_name=self.dba_name,
+            physical_address=self.physical_address,
+            mailing_address=self.mailing_address,
+            phone=self.phone_number,
+            mc_mx_ff_numbers=self.mc_mx_ff_numbers,
+            mcs_150_form_date=self.mcs_150_form_date_raw,
+            mcs_150_mileage_year=self.mcs_150_mileage_year,
+            out_of_service_date=self.out_of_service_date_raw,
+            operation_classification=self.operation_classification,
+            carrier_operation=self.carrier_operation,
+            cargo_carried=self.cargo_carried,
+        )
+        return data
+
+
+def parse_mileage_year(value: str | None) -> dict:
+    """Splits SAFER's "120,000 (2022)" mileage into the `{"mileage": ..., "year": ...}` shape `safer` uses."""
+    if not value:
+        return {"mileage": None, "year": None}
+    parts = value.split(" ")
+    return {"mileage": int(parts[0].replace(",", "")), "year": int(parts[1].replace("(", "").replace(")", ""))}
+
+
+def parse_snapshot(tree) -> LiteSnapshot:
+    """Extracts a LiteSnapshot from a parsed SAFER company snapshot page."""
+    general_info_table = tree.xpath("//table")[6]
+    values = {name: process_extracted_text(general_info_table.xpath(path)) for name, path in TEXT_FIELDS.items()}
+
+    for name, summary in CHECKBOX_TABLES.items():
+        tables = tree.xpath(f'//table[@summary="{summary}"]')
+        values[name] = list(tables[0].xpath(CHECKED_XPATH)) if len(tables) == 1 else None
+
+    # Operation classification's free-text "Other" entry, as `safer` picks it up
+    tables = tree.xpath('//table[@summary="Operation Classification"]')
+    if len(tables) == 1:
+        other = tables[0].xpath("tr[2]/td[3]/table/tr[5]/td[2]/text()")
+        if other:
+            values["operation_classification"].append(process_extracted_text(other))
+
+    return LiteSnapshot(
+        usdot=values["usdot"],
+        legal_name=values["legal_name"],
+        dba_name=values["dba_name"] or None,
+        physical_address=values["physical_address"],
+        mailing_address=values["mailing_address"],
+        phone_number=values["phone"],
+        mc_mx_ff_numbers=values["mc_mx_ff_numbers"],
+        mcs_150_form_date_raw=values["mcs_150_form_date"],
+        mcs_150_mileage_year=parse_mileage_year(values["mcs_150_mileage_year"]),
+        out_of_service_date_raw=values["out_of_service_date"] if values["out_of_service_date"] != "None" else None,
+        operation_classification=values["operation_classification"],
+        carrier_operation=values["carrier_operation"],
+        cargo_carried=values["cargo_carried"],
+    )
+
+
+class LiteClient:
+    """
+    Lightweight stand-in for `safer.CompanySnapshot`: requests go through a keep-alive connection pool sized
+    for the fetch workers, and only the fields we use are extracted from the page, into a LiteSnapshot.
+
+    Raises the same exceptions as `safer`, and queries whatever endpoint `safer.api.SAFER_QUERY_URL` points to.
+    """
+
+    def __init__(self, pool_size: int = 10):
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            key: value for key, value in safer.api.sess.headers.items() if key != "Host"
+        })
+        log.debug(f"Using the lightweight SAFER client with up to {pool_size} pooled connections.")
+
+    def get_by_usdot_number(self, number: int) -> LiteSnapshot:
+        r = self.session.post(
+            url=safer.api.SAFER_QUERY_URL,
+            data={
+                "searchType": "ANY",
+                "query_type": "queryCarrierSnapshot",
+                "query_param": "USDOT",
+                "query_string": number,
+            },
+        )
+        if r.status_code > 399:
+            raise SAFERUnreachableException(f"The SAFER website is currently unreachable with status code: {r.status_code} {r.reason}")
+
+        tree = parse_html_to_tree(r.text)
+        if tree is None or len(tree) == 0:
+            raise CompanySnapshotNotFoundException("The USDOT number provided was not found.")
+
+        return parse_snapshot(tree)
@@ -0,0 +1,57 @@
+from PyPDFForm import PdfWrapper
+
+import copy
+import hashlib
+
+from config import Config
+from sheet import contact_fields
+from log import log
+
+
+class FormTemplate:
+    """
+    MCS-150 template PDF, read and parsed once, handing out cheap per-company copies for filling.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        log.debug(f"Loading MCS-150 template at: '{path}'.")
+        with open(path, "rb") as f:
+            data = f.read()
+        # Identifies the template's contents, so forms filled from an older template can be told apart
+        self.digest = hashlib.sha256(data).hexdigest()
+        self._form = PdfWrapper(data)
+
+    @property
+    def fields(self) -> dict[str, str]:
+        """Catalog of the template's form fields: field name -> widget type (e.g. 'Text', 'Checkbox')."""
+        return {name: type(widget).__name__ for name, widget in self._form.widgets.items()}
+
+    def new_form(self) -> PdfWrapper:
+        """Returns an unfilled copy of the parsed template, without re-reading or re-parsing the PDF."""
+        return copy.deepcopy(self._form)
+
+    def missing_fields(self) -> list[str]:
+        """
+        Returns the form field names used by the field maps in `Config` and by the spreadsheet contact info
+        that the template doesn't have.
+        """
+        mapped = set(Config.FIELDS_MAP_TEXT.values())
+        mapped.update(Config.FIELDS_MAP_BOXES.values())
+        for address_fields in Config.FIELDS_MAP_ADDRESSES.values():
+            mapped.update(address_fields)
+        mapped.update(contact_fields("", ""))
+
+        return sorted(mapped - set(self._form.widgets))
+
+    def validate_field_maps(self) -> None:
+        """
+        Checks the field maps against the template's field catalog.
+
+        Raises:
+            ValueError: If any mapped field is missing from the template, since filling would silently skip it.
+        """
+        missing = self.missing_fields()
+        if missing:
+            raise ValueError(f"MCS-150 template at '{self.path}' has no fields named: {', '.join(missing)}. Check the field maps.")
+        log.debug(f"All mapped fields are present in the MCS-150 template ({len(self._form.widgets)} fields).")
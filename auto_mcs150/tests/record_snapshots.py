@@ -0,0 +1,63 @@
+"""
+Records SAFER company snapshot responses as test fixtures for `test_backend_parity.py`.
+
+Each page is fetched with the same request the `safer` backend sends and saved byte for byte under
+`fixtures/recorded/`, so the parity test checks both backends against SAFER's actual markup:
+
+    python tests/record_snapshots.py --found 1234567 --missing_fields 2345678 --not_found 9999999999
+
+`--missing_fields` should be a carrier whose snapshot leaves fields like the DBA name, phone, MC number or
+mileage empty. Re-record when SAFER's layout changes, and commit the pages with the change they test.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "recorded")
+KINDS = ("found", "missing_fields", "not_found")
+
+
+def record(kind: str, usdot: int) -> str:
+    """Fetches the USDOT's snapshot page from SAFER and saves it as the `kind` fixture. Returns the page's path."""
+    from safer.api import api_call_get_usdot
+
+    r = api_call_get_usdot(usdot)
+    r.raise_for_status()
+
+    os.makedirs(RECORDED_DIR, exist_ok=True)
+    path = os.path.join(RECORDED_DIR, f"{kind}.html")
+    with open(path, "wb") as f:
+        f.write(r.content)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record SAFER company snapshot pages as backend parity fixtures.")
+    for kind in KINDS:
+        parser.add_argument(f"--{kind}", type=int, metavar="USDOT", help=f"USDOT to record as the '{kind}' page.")
+    args = parser.parse_args()
+
+    wanted = {kind: getattr(args, kind) for kind in KINDS if getattr(args, kind) is not None}
+    if not wanted:
+        parser.error(f"Give at least one of: {', '.join('--' + kind for kind in KINDS)}.")
+
+    index_path = os.path.join(RECORDED_DIR, "index.json")
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+
+    for kind, usdot in wanted.items():
+        print(f"Recorded USDOT {usdot} as '{kind}': {record(kind, usdot)}")
+        index[kind] = usdot
+
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
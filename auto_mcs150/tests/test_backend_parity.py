@@ -0,0 +1,165 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from safer.exceptions import CompanySnapshotNotFoundException
+
+import fetch
+from company import SimpleCompany
+from sheet import contact_fields
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Pages recorded from SAFER with `record_snapshots.py`
+RECORDED_DIR = os.path.join(FIXTURES_DIR, "recorded")
+# Pages in the layout `fake_safer.py` renders, so the fake server the benchmark uses stays parseable
+SYNTHETIC_DIR = os.path.join(FIXTURES_DIR, "synthetic")
+
+COMPANY_PAGES = ("found", "missing_fields")
+NOT_FOUND_PAGE = "not_found"
+
+
+def read_page(pages_dir: str, kind: str) -> bytes | None:
+    path = os.path.join(pages_dir, f"{kind}.html")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    # Page served for every query, whatever USDOT it asks for
+    page = b""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(self.page)))
+        self.end_headers()
+        self.wfile.write(self.page)
+
+    def log_message(self, *args):
+        pass
+
+
+class BackendParityChecks:
+    """
+    Both SAFER backends fetch the pages in `pages_dir` through their real clients, from a local server standing
+    in for SAFER, and have to produce the same companies and form fields.
+    """
+    pages_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+        import safer.api
+        cls.original_url = safer.api.SAFER_QUERY_URL
+        cls.original_host = safer.api.sess.headers.get("Host")
+        fetch.set_safer_url(f"http://127.0.0.1:{cls.server.server_address[1]}/query.asp")
+
+    @classmethod
+    def tearDownClass(cls):
+        import safer.api
+        safer.api.SAFER_QUERY_URL = cls.original_url
+        if cls.original_host is not None:
+            safer.api.sess.headers["Host"] = cls.original_host
+        fetch.use_backend("safer")
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def serve(self, kind: str) -> None:
+        page = read_page(self.pages_dir, kind)
+        if page is None:
+            self.skipTest(f"No '{kind}' page in '{self.pages_dir}'.")
+        _PageHandler.page = page
+
+    def fetch_with(self, backend: str, usdot: int = 1):
+        fetch.use_backend(backend)
+        return fetch.CLIENT.get_by_usdot_number(usdot)
+
+    def company(self, kind: str, backend: str = "lite") -> SimpleCompany:
+        self.serve(kind)
+        return SimpleCompany.from_company(self.fetch_with(backend))
+
+    def test_pages_parse_the_same_with_both_backends(self):
+        for kind in COMPANY_PAGES:
+            with self.subTest(page=kind):
+                self.serve(kind)
+                full = SimpleCompany.from_company(self.fetch_with("safer"))
+                lite = SimpleCompany.from_company(self.fetch_with("lite"))
+                # Contact info the spreadsheet would add to the form fields
+                contact_index = {full.usdot: contact_fields("JANE DOE, JOHN DOE", "jane@example.com")}
+
+                self.assertEqual(full, lite)
+                self.assertEqual(full.form_fields(contact_index), lite.form_fields(contact_index))
+
+    def test_missing_fields_fall_back_to_defaults(self):
+        company = self.company("missing_fields")
+
+        defaults = {"dba_name": "", "phone": "", "mc": "", "mileage": "0"}
+        missing = {name for name, default in defaults.items() if getattr(company, name) == default}
+        self.assertTrue(missing, "The missing fields page should leave at least one field empty.")
+
+    def test_not_found_raises_with_both_backends(self):
+        self.serve(NOT_FOUND_PAGE)
+        for backend in fetch.BACKENDS:
+            with self.subTest(backend=backend):
+                with self.assertRaises(CompanySnapshotNotFoundException):
+                    self.fetch_with(backend)
+
+
+class RecordedPagesTest(BackendParityChecks, unittest.TestCase):
+    pages_dir = RECORDED_DIR
+
+    @classmethod
+    def setUpClass(cls):
+        if not os.path.isdir(RECORDED_DIR):
+            raise unittest.SkipTest("No recorded SAFER pages, record them with `python tests/record_snapshots.py`.")
+        super().setUpClass()
+
+    def test_found_page_is_the_recorded_usdot(self):
+        with open(os.path.join(RECORDED_DIR, "index.json")) as f:
+            usdot = json.load(f).get("found")
+        if usdot is None:
+            self.skipTest("No 'found' page recorded.")
+
+        company = self.company("found")
+
+        self.assertEqual(company.usdot, str(usdot))
+        self.assertTrue(company.legal_name)
+        self.assertTrue(company.physical_address)
+
+
+class SyntheticPagesTest(BackendParityChecks, unittest.TestCase):
+    pages_dir = SYNTHETIC_DIR
+
+    def test_found_page_is_fully_parsed(self):
+        company = self.company("found")
+
+        self.assertEqual(company.legal_name, "BLUE IRON PRAIRIE")
+        self.assertEqual(company.dba_name, "FREIGHT COASTAL")
+        self.assertEqual(company.physical_address, ("3043 RIVER RD", "SPRINGFIELD", "IL", "62726"))
+        self.assertEqual(company.mailing_address, ("684 MAIN ST", "PHOENIX", "AZ", "85000"))
+        self.assertEqual(company.mc, "MC-631731")
+        self.assertEqual(company.mileage, "384,286")
+        self.assertEqual(company.cargo_carried, ("Household Goods", "Metal: sheets, coils, rolls"))
+
+    def test_missing_fields_page_is_parsed_with_defaults(self):
+        company = self.company("missing_fields")
+
+        self.assertEqual((company.dba_name, company.phone, company.mc, company.mileage), ("", "", "", "0"))
+        # Same as the physical address, so left out
+        self.assertEqual(company.mailing_address, ())
+        self.assertEqual(company.cargo_carried, ())
+
+
+if __name__ == "__main__":
+    unittest.main()
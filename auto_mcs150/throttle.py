@@ -0,0 +1,111 @@
+import threading
+import time
+
+from log import log
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls evenly so that no more than `rate` of them
+    start per second, across all threads sharing the limiter.
+    """
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError("Rate limit must be a positive number of requests per second.")
+        self.rate = rate
+        self.interval = 1 / rate
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Blocks the calling thread until its reserved time slot comes up."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def success(self) -> None:
+        """Feedback hook for a request that went through. A fixed limiter ignores it."""
+
+    def throttled(self) -> None:
+        """Feedback hook for a request that failed in a way that suggests we're going too fast. A fixed limiter ignores it."""
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    RateLimiter that tunes its own rate from request outcomes (additive increase, multiplicative decrease):
+    every success nudges the rate up so that it climbs by about `increase` requests per second each second,
+    and a throttling failure cuts it by `decrease`. The rate stays within [min_rate, max_rate], so it settles
+    just under the highest rate the server tolerates.
+    """
+
+    def __init__(self, rate: float, max_rate: float, min_rate: float = 0.1, increase: float = 0.1, decrease: float = 0.5):
+        super().__init__(rate)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self._last_decrease = 0.0
+
+    def _set_rate(self, rate: float) -> None:
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        self.interval = 1 / self.rate
+
+    def success(self) -> None:
+        with self._lock:
+            self._set_rate(self.rate + self.increase / self.rate)
+
+    def throttled(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            # Requests in flight tend to fail together; count a burst of failures as one signal
+            if now - self._last_decrease < 1:
+                return
+            self._last_decrease = now
+            self._set_rate(self.rate * self.decrease)
+            # Push back slots that were handed out at the old, too fast rate
+            self._next_slot = max(self._next_slot, now + self.interval)
+        log.debug(f"SAFER is pushing back, lowering the request rate to {self.rate:.2f}/s.")
+
+
+class CircuitBreaker:
+    """
+    Stops every worker once `threshold` requests in a row have failed, e.g. while SAFER is down.
+
+    While open, `wait()` blocks all callers until `cooldown` seconds have passed. The requests let through
+    afterwards act as probes: one success closes the breaker, another failure opens it again right away.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        while True:
+            with self._lock:
+                remaining = self._open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def success(self) -> None:
+        with self._lock:
+            if self._failures >= self.threshold:
+                log.info("SAFER is reachable again, resuming requests.")
+            self._failures = 0
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            now = time.monotonic()
+            if self._failures >= self.threshold and now >= self._open_until:
+                self._open_until = now + self.cooldown
+                log.warning(f"{self._failures} SAFER requests failed in a row, pausing all requests for {self.cooldown} seconds.")
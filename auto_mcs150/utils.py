@@ -1,27 +1,9 @@
 from datetime import datetime as dt
-import usaddress
 
 from config import Config
 from log import log
 
 
-def split_address(address : str) -> tuple[str, str, str, str]:
-    parsed_address = usaddress.tag(address)[0]
-
-    street = []
-    for key, value in parsed_address.items():
-        if key == "PlaceName":
-            break
-        street.append(value) if value else street.append("")
-    street = " ".join(street)
-
-    city = parsed_address.get("PlaceName", "")
-    state = parsed_address.get("StateName", "")
-    zipcode = parsed_address.get("ZipCode", "")
-
-    return (street, city, state, zipcode)
-
-
 def handled_paths(args) -> dict:
     # Handle path_to_mcs150_template argument, fallback to Config.MCS150_TEMPLATE_PATH
     if not args.path_to_mcs150_template: